@@ -0,0 +1,343 @@
+"""
+=======================================
+HPLC原始数据处理与吸附动力学拟合脚本
+=======================================
+📌 功能说明：
+    本脚本用于处理HPLC导出的吸附动力学数据（同一批实验的所有样品放在一个文件中），自动完成：
+    1. 峰面积 → 去除率 → Qt 计算（与 adsorption_model_fitting.py 使用同一套计算）
+    2. 同一样品同一时间点的平行样取均值与标准差
+    3. 准一级（PFO）、准二级（PSO）、Elovich、Weber-Morris 颗粒内扩散模型拟合：
+       所有样品补齐为矩阵后，每个模型用批量 Levenberg-Marquardt 一次拟合全部样品（解析雅可比），
+       个别未收敛的样品再单独拟合
+    4. 每个样品每个模型的参数与R²、RMSE、MAE、AIC、BIC，按 AIC/BIC 选出最优模型
+    5. （可选）全部拟合完成后再绘制每个样品的“Qt-t”动力学曲线
+
+📌 动力学模型（t 单位 min，Qt 单位 mg/g）：
+    - PFO:           Qt = qe·(1 - exp(-k1·t))
+    - PSO:           Qt = k2·qe²·t / (1 + k2·qe·t)
+    - Elovich:       Qt = (1/β)·ln(1 + α·β·t)
+    - Weber-Morris:  Qt = kid·t^0.5 + C
+    t = 0 的点不参与拟合。
+
+📌 输入文件格式示例：
+    | sample   | time(min) | initial_conc(mM) | initial_peak_area | after_peak_area |
+    |----------|-----------|------------------|-------------------|-----------------|
+    | TJ700-ACP| 5         | 0.5              | 1234567           | 934567          |
+    | TJ700-ACP| 5         | 0.5              | 1234560           | 931200          |
+    | TJ700-ACP| 10        | 0.5              | 1234567           | 734567          |
+    | MZ700-SMX| 5         | 0.5              | 2234567           | 1934567         |
+
+📌 元数据表格式示例（可选，按 sample 查找；未提供时所有样品使用顶部的 MW 与 adsorbent_conc_g_L）：
+    | sample   | BIOCHAR_TYPE | POLLUTANT_NAME | MW     | adsorbent_conc_g_L |
+    |----------|--------------|----------------|--------|--------------------|
+    | TJ700-ACP| TJ700        | ACP            | 151.16 | 5                  |
+
+📌 输出内容：
+    1. 参数汇总表 RESULTS_CSV_PATH（每个样品一行）
+    2. （MAKE_PLOTS 为 True 时）图像文件：<sample>-Adsorption Kinetics.png
+=======================================
+"""
+
+# === 自己需要修改的变量 ===
+
+kinetics_csv_path = 'kinetics-raw.csv'
+METADATA_CSV_PATH = None   # 例如 'kinetics-metadata.csv'；None 表示所有样品使用下面的 MW 与 adsorbent_conc_g_L
+
+MW = 151.16
+adsorbent_conc_g_L = 5
+
+sample_name = "sample"
+time_name = "time(min)"
+
+MODELS_TO_FIT = ['PFO', 'PSO', 'Elovich', 'Weber-Morris']
+PLOT_MODELS = ['PFO', 'PSO', 'Elovich', 'Weber-Morris']
+
+RESULTS_CSV_PATH = 'kinetics_fit_results.csv'
+MAKE_PLOTS = True
+N_WORKERS = None   # 绘图进程数，None 表示 CPU 核数
+
+# === 自己需要修改的变量 ===
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from adsorption_model_fitting import calculate_removal, initial_conc_name, setup_plot_style
+from isotherm_models import IsothermModel, fit_model, stack_jacobian
+from isotherm_uncertainty import batch_least_squares
+
+
+def _row_linear_fit(x, y):
+    """逐行（最后一维）最小二乘直线，忽略 NaN；返回 (slope, intercept)，一维输入时为标量。"""
+    mask = np.isfinite(x) & np.isfinite(y)
+    x = np.where(mask, x, np.nan)
+    y = np.where(mask, y, np.nan)
+    dx = x - np.nanmean(x, axis=-1, keepdims=True)
+    dy = y - np.nanmean(y, axis=-1, keepdims=True)
+    slope = np.nansum(dx * dy, axis=-1) / np.nansum(dx**2, axis=-1)
+    intercept = np.nanmean(y, axis=-1) - slope * np.nanmean(x, axis=-1)
+    return slope, intercept
+
+
+def _rate_guess(t, qt):
+    """由达到一半平衡吸附量的时间估计 (qe, k1)：k1 = ln2 / t½。"""
+    qe = np.nanmax(qt, axis=-1) * 1.05
+    t_half = np.min(np.where(qt >= qe[..., None] / 2, t, np.inf), axis=-1)
+    fallback = 1 / np.nanmedian(np.where(t > 0, t, np.nan), axis=-1)
+    return qe, np.where(np.isfinite(t_half) & (t_half > 0), np.log(2) / t_half, fallback)
+
+
+# --- PFO ---
+
+def pfo_model(t, qe, k1):
+    return qe * (1 - np.exp(-k1 * t))
+
+def pfo_jac(t, qe, k1):
+    e = np.exp(-k1 * t)
+    return stack_jacobian([1 - e, qe * t * e])
+
+
+# --- PSO ---
+
+def pso_model(t, qe, k2):
+    return k2 * qe**2 * t / (1 + k2 * qe * t)
+
+def pso_jac(t, qe, k2):
+    d = 1 + k2 * qe * t
+    return stack_jacobian([k2 * qe * t * (2 + k2 * qe * t) / d**2, qe**2 * t / d**2])
+
+def _pso_guess(t, qt):
+    qe, k1 = _rate_guess(t, qt)
+    return [qe, k1 / qe]
+
+
+# --- Elovich ---
+
+def elovich_model(t, alpha, beta):
+    return np.log1p(alpha * beta * t) / beta
+
+def elovich_jac(t, alpha, beta):
+    d = 1 + alpha * beta * t
+    return stack_jacobian([t / d, alpha * t / (beta * d) - np.log(d) / beta**2])
+
+def _elovich_guess(t, qt):
+    """由 Qt ≈ (1/β)·ln(αβ) + (1/β)·ln t 估计：β = 1/斜率，α = 斜率·exp(截距/斜率)。"""
+    slope, intercept = _row_linear_fit(np.log(np.where(t > 0, t, np.nan)), qt)
+    qe, k1 = _rate_guess(t, qt)
+    valid = np.isfinite(slope) & (slope > 0)
+    slope = np.where(valid, slope, 1)
+    beta = np.where(valid, 1 / slope, 1 / qe)
+    alpha = np.where(valid, slope * np.exp(np.clip(intercept / slope, -50, 50)), qe * k1)
+    return [alpha, beta]
+
+
+# --- Weber-Morris ---
+
+def weber_morris_model(t, kid, C):
+    return kid * np.sqrt(t) + C
+
+def weber_morris_jac(t, kid, C):
+    return stack_jacobian([np.sqrt(t), np.ones_like(t * kid)])
+
+def _weber_morris_guess(t, qt):
+    slope, intercept = _row_linear_fit(np.sqrt(np.where(t > 0, t, np.nan)), qt)
+    return [np.where(slope > 0, slope, np.nanmax(qt, axis=-1) / np.sqrt(np.nanmax(t, axis=-1))), intercept]
+
+
+# 动力学模型与等温线模型结构相同（func(t, *params) → Qt），沿用 IsothermModel
+KINETIC_MODELS = {
+    'PFO': IsothermModel(
+        'PFO', ('qe', 'k1'), pfo_model, pfo_jac, lambda t, qt: list(_rate_guess(t, qt)),
+        ([0, 0], [np.inf, np.inf]), r'Q_t = q_e (1 - e^{-k_1 t})',
+    ),
+    'PSO': IsothermModel(
+        'PSO', ('qe', 'k2'), pso_model, pso_jac, _pso_guess,
+        ([0, 0], [np.inf, np.inf]), r'Q_t = \frac{k_2 q_e^2 t}{1 + k_2 q_e t}',
+    ),
+    'Elovich': IsothermModel(
+        'Elovich', ('alpha', 'beta'), elovich_model, elovich_jac, _elovich_guess,
+        ([0, 0], [np.inf, np.inf]), r'Q_t = \frac{1}{\beta} \ln(1 + \alpha \beta t)',
+    ),
+    'Weber-Morris': IsothermModel(
+        'Weber-Morris', ('kid', 'C'), weber_morris_model, weber_morris_jac, _weber_morris_guess,
+        ([0, -np.inf], [np.inf, np.inf]), r'Q_t = k_{id} t^{0.5} + C',
+    ),
+}
+
+
+def prepare_samples(data, metadata=None):
+    """
+    计算每行的去除率与 Qt，同一样品同一时间点的平行样取均值与标准差，并按样品补齐为矩阵。
+
+    返回:
+        (samples, t, qt, qt_std): samples 为样品信息表（每行一个样品），t/qt/qt_std 形状均为
+        (样品数, 最多时间点数)，不足的位置为 NaN
+    """
+    data = data.copy()
+    if metadata is not None:
+        metadata = metadata.set_index(sample_name)
+        missing = sorted(set(data[sample_name]) - set(metadata.index))
+        if missing:
+            raise KeyError(f'元数据表中缺少样品: {missing}')
+        sample_MW = data[sample_name].map(metadata['MW']).astype(float)
+        sample_dose = data[sample_name].map(metadata['adsorbent_conc_g_L']).astype(float)
+    else:
+        sample_MW, sample_dose = MW, adsorbent_conc_g_L
+    # calculate_removal 逐元素计算，MW 与投加量可以是每行不同的 Series
+    data = calculate_removal(data, sample_MW, sample_dose).rename(columns={'Ce(mg/L)': 'Ct(mg/L)', 'Qe(mg/g)': 'Qt(mg/g)'})
+
+    points = (
+        data
+        .groupby([sample_name, time_name])
+        .agg(**{
+            'Qt(mg/g)_mean': ('Qt(mg/g)', 'mean'),
+            'Qt(mg/g)_std': ('Qt(mg/g)', 'std'),
+            initial_conc_name: (initial_conc_name, 'first'),
+        })
+        .reset_index()
+    )
+    points['point'] = points.groupby(sample_name).cumcount()
+    t = points.pivot(index=sample_name, columns='point', values=time_name)
+    qt = points.pivot(index=sample_name, columns='point', values='Qt(mg/g)_mean')
+    qt_std = points.pivot(index=sample_name, columns='point', values='Qt(mg/g)_std')
+
+    samples = points.groupby(sample_name)[initial_conc_name].first().reset_index()
+    if metadata is not None:
+        samples = samples.join(metadata, on=sample_name)
+    else:
+        samples['MW'], samples['adsorbent_conc_g_L'] = MW, adsorbent_conc_g_L
+    return samples, t.to_numpy(float), qt.to_numpy(float), qt_std.to_numpy(float)
+
+
+def _valid_points(t, qt):
+    """参与拟合的点：t > 0 且 Qt 有效。"""
+    return (t > 0) & np.isfinite(qt)
+
+
+def batch_metrics(model, t, qt, params):
+    """逐样品计算 R²、RMSE、MAE、AIC、BIC（t ≤ 0 或缺失的点不计）；有效点数不多于参数个数的样品全部为 NaN。"""
+    mask = _valid_points(t, qt)
+    n = mask.sum(axis=1)
+    k = params.shape[1]
+    with np.errstate(all='ignore'):
+        predict = model.func(np.where(mask, t, 1.0), *params.T[:, :, None])
+        residuals = np.where(mask, qt - predict, 0.0)
+        rss = np.sum(residuals**2, axis=1)
+        mean = np.sum(np.where(mask, qt, 0.0), axis=1) / n
+        ss_tot = np.sum(np.where(mask, qt - mean[:, None], 0.0)**2, axis=1)
+        base = n * np.log(np.maximum(rss, np.finfo(float).tiny) / n)
+        metrics = {
+            'R2': np.where(ss_tot > 0, 1 - rss / ss_tot, np.nan),
+            'RMSE': np.sqrt(rss / n),
+            'MAE': np.sum(np.abs(residuals), axis=1) / n,
+            'AIC': base + 2 * k,
+            'BIC': base + k * np.log(n),
+        }
+    enough = n > k
+    return {name: np.where(enough, value, np.nan) for name, value in metrics.items()}
+
+
+def fit_kinetics(t, qt, models=MODELS_TO_FIT):
+    """
+    对所有样品拟合各动力学模型：批量拟合一次，未收敛的样品再用 fit_model 单独拟合。
+    有效点数不多于参数个数的样品不拟合，参数与指标均为 NaN。
+
+    返回:
+        dict: 模型名 → {"params": (样品数, 参数数) 数组, "R2", "RMSE", "MAE", "AIC", "BIC": (样品数,) 数组}
+    """
+    fits = {}
+    for name in models:
+        model = KINETIC_MODELS[name]
+        params = np.full((len(t), len(model.param_names)), np.nan)
+        fittable = _valid_points(t, qt).sum(axis=1) > len(model.param_names)
+        if fittable.any():
+            t_fit, qt_fit = t[fittable], qt[fittable]
+            with np.errstate(all='ignore'):
+                p0 = np.stack(np.broadcast_arrays(*model.initial_guess(t_fit, qt_fit)), axis=-1)
+            p0 = np.nan_to_num(p0, nan=1.0, posinf=1.0, neginf=1.0)
+            fitted, converged = batch_least_squares(model, t_fit, qt_fit, p0)
+            for i in np.flatnonzero(~converged):
+                mask = _valid_points(t_fit[i], qt_fit[i])
+                fit = fit_model(model, t_fit[i][mask], qt_fit[i][mask])
+                fitted[i] = list(fit['params'].values()) if 'params' in fit else np.nan
+            params[fittable] = fitted
+        fits[name] = {'params': params, **batch_metrics(model, t, qt, params)}
+    return fits
+
+
+def results_table(samples, fits):
+    """把拟合结果整理为每个样品一行的参数表，并按 AIC/BIC 选出每个样品的最优模型。"""
+    table = samples.copy()
+    for name, fit in fits.items():
+        for k, param in enumerate(KINETIC_MODELS[name].param_names):
+            table[f'{name}_{param}'] = fit['params'][:, k]
+        for metric in ('R2', 'RMSE', 'MAE', 'AIC', 'BIC'):
+            table[f'{name}_{metric}'] = fit[metric]
+    names = np.array(list(fits), dtype=object)
+    for criterion in ('AIC', 'BIC'):
+        scores = np.column_stack([fit[criterion] for fit in fits.values()])
+        missing = np.isnan(scores)
+        best = names[np.argmin(np.where(missing, np.inf, scores), axis=1)]
+        table[f'best_model_{criterion}'] = np.where(missing.all(axis=1), None, best)
+    return table
+
+
+def plot_kinetics(job):
+    """绘制一个样品的 "Qt-t" 动力学曲线与各模型拟合曲线，保存为 <sample>-Adsorption Kinetics.png。"""
+    import matplotlib
+    matplotlib.use('Agg')
+    plt = setup_plot_style()
+    sample, t, qt, qt_std, fits = job
+    valid = np.isfinite(t) & np.isfinite(qt)
+    t_fit = np.linspace(0, np.nanmax(t), 200)
+
+    plt.figure(figsize=(10,6))
+    plt.errorbar(t[valid], qt[valid], fmt='o', ecolor='red', capsize=5,
+                 yerr=np.nan_to_num(qt_std[valid]), color='black', label='Experimental Data')
+    styles = ['r-', 'b--', 'g-.', 'm:']
+    for (name, fit), style in zip(fits.items(), styles):
+        if not np.all(np.isfinite(fit['params'])):
+            continue
+        model = KINETIC_MODELS[name]
+        with np.errstate(all='ignore'):
+            qt_fit = model.func(t_fit, *fit['params'])
+        params = ', '.join(f'{param}={value:.3g}' for param, value in zip(model.param_names, fit['params']))
+        plt.plot(t_fit, qt_fit, style,
+                 label=f"{name} Fit: ${model.latex}$\n${params}$\n$R^2={fit['R2']:.3f}$")
+
+    plt.xlabel('t (min)')
+    plt.ylabel('Qt (mg/g)')
+    plt.title(f'{sample}-Adsorption Kinetics')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(f'{sample}-Adsorption Kinetics.png', dpi=500, facecolor='white')
+    plt.close()
+
+
+def run_kinetics(data, metadata=None, results_path=RESULTS_CSV_PATH, make_plots=MAKE_PLOTS, workers=N_WORKERS):
+    """一次处理整批动力学数据：拟合所有样品、写出参数表，make_plots 为 True 时再并行绘图。返回参数表。"""
+    samples, t, qt, qt_std = prepare_samples(data, metadata)
+    fits = fit_kinetics(t, qt)
+    table = results_table(samples, fits)
+    table.to_csv(results_path, index=False, encoding='utf-8')
+    print(f"已拟合 {len(table)} 个样品，参数表：{results_path}")
+
+    if make_plots:
+        plot_jobs = [
+            (sample, t[i], qt[i], qt_std[i], {
+                name: {'params': fits[name]['params'][i], 'R2': fits[name]['R2'][i]}
+                for name in PLOT_MODELS if name in fits
+            })
+            for i, sample in enumerate(samples[sample_name])
+            if _valid_points(t[i], qt[i]).any()
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(plot_kinetics, plot_jobs))
+    return table
+
+
+if __name__ == "__main__":
+    metadata = pd.read_csv(METADATA_CSV_PATH) if METADATA_CSV_PATH else None
+    run_kinetics(pd.read_csv(kinetics_csv_path), metadata)
@@ -6,12 +6,19 @@ HPLC原始数据处理与吸附等温线拟合脚本
     本脚本用于处理HPLC原始吸附实验数据，自动完成：
     1. 数据读取与清洗（含初始浓度、峰面积等）
     2. 吸附量（Qe）与平衡浓度（Ce）计算
-    3. Langmuir与Freundlich模型拟合
-    4. 拟合参数输出与R²、RMSE、MAE评估
+    3. 等温线模型拟合（Langmuir、Freundlich、Sips、Temkin、Redlich-Peterson、Toth、D-R，
+       模型定义见 isotherm_models.py，使用解析雅可比与数据估计的初始值）
+    4. 拟合参数输出与R²、RMSE、MAE评估，按 AIC/BIC 选择最优模型
+       参数标准误取自拟合的协方差矩阵；可选 bootstrap/jackknife 置信区间（见 isotherm_uncertainty.py），
+       图中以阴影带显示拟合曲线的置信区间
     5. 生成高质量“Qe-Ce”吸附等温线图表（支持LaTeX公式渲染）
 
 📌 使用场景：
     适用于吸附质对吸附剂的吸附实验数据处理。
+    - 单文件模式（RAW_CSV_GLOB = None）：处理 csv_file_path 一个文件，参数取自顶部变量
+    - 批量模式（RAW_CSV_GLOB 为目录或通配符）：处理所有匹配的原始数据文件，每个文件的
+      BIOCHAR_TYPE、POLLUTANT_NAME、MW、adsorbent_conc_g_L 从 METADATA_CSV_PATH 中按文件名查找；
+      所有文件先在进程池中并行拟合，汇总为一张参数表，之后（可选）再统一绘图
 
 📌 输入文件格式示例：
     | initial_conc(mM) | initial_peak_area | after_peak_area |
@@ -21,10 +28,17 @@ HPLC原始数据处理与吸附等温线拟合脚本
     | 0.1              | 5521544           | 6485            |
     | 0.2              | 8855522           | 9578            |
 
+📌 元数据表格式示例（批量模式）：
+    | file             | BIOCHAR_TYPE | POLLUTANT_NAME | MW     | adsorbent_conc_g_L |
+    |------------------|--------------|----------------|--------|--------------------|
+    | TJ700-ACP-raw.csv| TJ700        | ACP            | 151.16 | 5                  |
+    | MZ700-SMX-raw.csv| MZ700        | SMX            | 253.28 | 5                  |
+
 📌 输出内容：
     1. 新CSV文件（含计算字段）：xxx-caculated.csv
-    2. 图像文件（含双模型拟合曲线）：xxx-Adsorption Isotherms.png
+    2. 图像文件（含 PLOT_MODELS 中各模型的拟合曲线）：xxx-Adsorption Isotherms.png
     3. 控制台输出：拟合参数与误差指标
+    4. 批量模式：汇总参数表 RESULTS_CSV_PATH（每个文件一行，失败的文件记录在 error 列）
 
 📌 注意事项：
     - 请确保路径正确，文件存在且格式无误。
@@ -55,125 +69,284 @@ initial_conc_name = "initial_conc(mM)"
 # | 0.4              | 1567890           | 12345           |
 # | 0.5              | 1678901           | 98765           |
 
+# 需要拟合的模型（名称见 isotherm_models.ISOTHERM_MODELS）与图中绘制的模型
+MODELS_TO_FIT = ['Langmuir', 'Freundlich', 'Sips', 'Temkin', 'Redlich-Peterson', 'Toth', 'Dubinin-Radushkevich']
+PLOT_MODELS = ['Langmuir', 'Freundlich']
+
+# 参数不确定度：None、'bootstrap' 或 'jackknife'（按初始浓度分组，对平行样重抽样）
+UNCERTAINTY_METHOD = None
+N_RESAMPLES = 1000   # bootstrap 重抽样次数
+CI_LEVEL = 0.95      # 置信水平
+RANDOM_SEED = 0
+
+# 批量模式：目录（处理其中所有 *-raw.csv）或通配符，如 'raw_data/*-raw.csv'；None 表示单文件模式
+RAW_CSV_GLOB = None
+METADATA_CSV_PATH = 'metadata.csv'            # 每个原始文件的 BIOCHAR_TYPE、POLLUTANT_NAME、MW、adsorbent_conc_g_L
+RESULTS_CSV_PATH = 'isotherm_fit_results.csv' # 汇总参数表
+MAKE_PLOTS = True                             # 批量模式下是否在全部拟合完成后绘图
+N_WORKERS = None                              # 进程数，None 表示 CPU 核数
+
 # === 自己需要修改的变量 ===
 
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy.optimize import curve_fit
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from matplotlib import rcParams
-
-
-# 启用 LaTeX 渲染
-rcParams['text.usetex'] = True  # 启用 LaTeX 支持
-rcParams['font.size'] = 14      # 设置字体大小
-# 设置图表风格
-sns.set_theme(style="darkgrid")
-sns.set_context("talk")
-
-data = pd.read_csv(csv_file_path)
-data['Removal Ratio'] = 1 - data[after_peak_area_name] / data[initial_peak_area_name]
-data['Ce(mg/L)'] = (1 - data['Removal Ratio']) * data[initial_conc_name] * MW
-data['Qe(mg/g)'] = data[initial_conc_name] * data['Removal Ratio'] * MW / adsorbent_conc_g_L
-
-# 使用 groupby 直接聚合所有需要的统计量
-stats = (
-    data
-    .groupby(initial_conc_name)
-    .agg(
-        **{
-            'Removal Ratio_mean': ('Removal Ratio', 'mean'),
-            'Removal Ratio_std': ('Removal Ratio', 'std'),
-            'Ce(mg/L)_mean': ('Ce(mg/L)', 'mean'),
-            'Ce(mg/L)_std': ('Ce(mg/L)', 'std'),
-            'Qe(mg/g)_mean': ('Qe(mg/g)', 'mean'),
-            'Qe(mg/g)_std': ('Qe(mg/g)', 'std')
-        }
+
+from isotherm_models import ISOTHERM_MODELS, best_model, fit_model
+from isotherm_uncertainty import bootstrap_fit, jackknife_fit
+
+
+def calculate_removal(data, MW, adsorbent_conc_g_L):
+    """由峰面积逐行计算去除率、溶液浓度 Ce 与吸附量 Qe（动力学数据中即 t 时刻的 Ct、Qt）。"""
+    data = data.copy()
+    data['Removal Ratio'] = 1 - data[after_peak_area_name] / data[initial_peak_area_name]
+    data['Ce(mg/L)'] = (1 - data['Removal Ratio']) * data[initial_conc_name] * MW
+    data['Qe(mg/g)'] = data[initial_conc_name] * data['Removal Ratio'] * MW / adsorbent_conc_g_L
+    return data
+
+
+def calculate_qe_ce(data, MW, adsorbent_conc_g_L):
+    """由峰面积计算去除率、Ce、Qe，并按初始浓度聚合均值与标准差（结果合并回每一行）。"""
+    data = calculate_removal(data, MW, adsorbent_conc_g_L)
+
+    # 使用 groupby 直接聚合所有需要的统计量
+    stats = (
+        data
+        .groupby(initial_conc_name)
+        .agg(
+            **{
+                'Removal Ratio_mean': ('Removal Ratio', 'mean'),
+                'Removal Ratio_std': ('Removal Ratio', 'std'),
+                'Ce(mg/L)_mean': ('Ce(mg/L)', 'mean'),
+                'Ce(mg/L)_std': ('Ce(mg/L)', 'std'),
+                'Qe(mg/g)_mean': ('Qe(mg/g)', 'mean'),
+                'Qe(mg/g)_std': ('Qe(mg/g)', 'std')
+            }
+        )
     )
-)
-
-data = data.merge(stats, on=initial_conc_name, how='left')
-
-Qe = data['Qe(mg/g)_mean'].unique()
-Ce = data['Ce(mg/L)_mean'].unique()
-
-data.to_csv(f'{csv_file_path}-caculated.csv', index=False, encoding='utf-8')
-
-# 定义模型函数
-def langmuir_model(Ce, Qmax, b):
-    return (Qmax * b * Ce) / (1 + b * Ce)
-
-def freundlich_model(Ce, Kf, n):
-    return Kf * Ce**(1/n)
-
-# 进行Langmuir拟合
-initial_guess_langmuir = [max(Qe), 1]  # 初始猜测：[Qmax, b]
-params_langmuir, covariance_langmuir = curve_fit(langmuir_model, Ce, Qe, p0=initial_guess_langmuir)
-Qmax_fit, b_fit = params_langmuir
-
-# 进行Freundlich拟合
-initial_guess_freundlich = [np.mean(Qe), 1]  # 初始猜测：[Kf, n]
-params_freundlich, covariance_freundlich = curve_fit(freundlich_model, Ce, Qe, p0=initial_guess_freundlich)
-Kf_fit, n_fit = params_freundlich
-
-# 生成拟合曲线数据
-Ce_fit = np.linspace(0, max(Ce), 100)
-Qe_langmuir_fit = langmuir_model(Ce_fit, *params_langmuir)
-Qe_freundlich_fit = freundlich_model(Ce_fit, *params_freundlich)
-
-Qe_langmuir_predict = langmuir_model(Ce, *params_langmuir)
-Qe_freundlich_predict = freundlich_model(Ce, *params_freundlich)
-# 计算 R²
-r2_langmuir = r2_score(Qe, Qe_langmuir_predict)
-r2_freundlich = r2_score(Qe, Qe_freundlich_predict)
-# 计算 RMSE（均方根误差）
-rmse_langmuir = np.sqrt(mean_squared_error(Qe, Qe_langmuir_predict))
-rmse_freundlich = np.sqrt(mean_squared_error(Qe, Qe_freundlich_predict))
-# 计算 MAE（平均绝对误差）
-mae_langmuir = mean_absolute_error(Qe, Qe_langmuir_predict)
-mae_freundlich = mean_absolute_error(Qe, Qe_freundlich_predict)
-
-# 输出结果
-print(f"Langmuir 拟合参数:")
-print(f"Qmax = {Qmax_fit:.2f} mg/g")
-print(f"b = {b_fit:.4f} L/mg")
-print(f"R² = {r2_langmuir:.4f}\n")
-
-print(f"Freundlich 拟合参数:")
-print(f"Kf = {Kf_fit:.2f} (mg/g)^1/n")
-print(f"n = {n_fit:.2f}")
-print(f"R² = {r2_freundlich:.4f}")
-
-
-# draw "Qe-Ce" figure
-plt.figure(figsize=(10,6))
-plt.errorbar(Ce, Qe, fmt='o', ecolor='red', capsize=5, 
-            yerr=data['Qe(mg/g)_std'].unique(), color='black', label='Experimental Data')
-
-
-# 绘制 Langmuir 拟合曲线
-plt.plot(
-    Ce_fit, Qe_langmuir_fit, 'r-', 
-    label=(r'Langmuir Fit: $Q_e = \frac{Q_{\mathrm{max}} \cdot b \cdot C_e}{1 + b \cdot C_e}$'
-           f'\n$Q_{{\mathrm{{max}}}}={Qmax_fit:.2f}, b={b_fit:.2f}$'
-           f'\n$R^2={r2_langmuir:.3f}, RMSE={rmse_langmuir:.3f}, MAE={mae_langmuir:.3f}$')
-)
-# 绘制 Freundlich 拟合曲线
-plt.plot(
-    Ce_fit, Qe_freundlich_fit, 'b--', 
-    label=(r'Freundlich Fit: $Q_e = K_f \cdot C_e^{1/n}$'
-           f'\n$K_f={Kf_fit:.2f}, n={n_fit:.2f}$'
-           f'\n$R^2={r2_freundlich:.3f}, RMSE={rmse_freundlich:.3f}, MAE={mae_freundlich:.3f}$')
-)
-
-
-plt.xlabel('Ce (mg/L)')
-plt.ylabel('Qe (mg/g)')
-plt.title(f'{BIOCHAR_TYPE}-{adsorbent_conc_g_L}g/L-{POLLUTANT_NAME}-Adsorption Isotherms')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(f'{csv_file_path}-Adsorption Isotherms.png', dpi=500, facecolor='white')
-plt.show()
+    return data.merge(stats, on=initial_conc_name, how='left'), stats
+
+
+def fit_isotherms(Ce, Qe, models=MODELS_TO_FIT):
+    """
+    对 (Ce, Qe) 拟合 models 中的所有模型（Ce ≤ 0 的点对多数模型无意义，拟合前去掉）。
+
+    返回:
+        dict: 模型名 → fit_model 的结果 {"params", "R2", "RMSE", "MAE", "AIC", "BIC", ...}；拟合失败时为 {"error": 原因}
+    """
+    mask = (Ce > 0) & np.isfinite(Qe)
+    return {name: fit_model(ISOTHERM_MODELS[name], Ce[mask], Qe[mask]) for name in models}
+
+
+def curve_grid(Ce):
+    """绘制拟合曲线（及其置信带）使用的 Ce 取值。"""
+    return np.linspace(0, max(Ce), 100)
+
+
+def parameter_uncertainty(data, fits, method):
+    """
+    对拟合成功的模型计算 bootstrap 或 jackknife 置信区间（以每行平行样为单位、按初始浓度分组重抽样）。
+
+    返回:
+        dict: 模型名 → bootstrap_fit / jackknife_fit 的结果
+    """
+    rows = data[data['Ce(mg/L)_mean'] > 0]
+    Ce_rows, Qe_rows, groups = rows['Ce(mg/L)'].to_numpy(), rows['Qe(mg/g)'].to_numpy(), rows[initial_conc_name].to_numpy()
+    Ce_grid = curve_grid(data['Ce(mg/L)_mean'].to_numpy())
+    rng = np.random.default_rng(RANDOM_SEED)
+    results = {}
+    for name, fit in fits.items():
+        if 'params' not in fit:
+            continue
+        model = ISOTHERM_MODELS[name]
+        if method == 'bootstrap':
+            results[name] = bootstrap_fit(model, Ce_rows, Qe_rows, groups, fit['params'].values(),
+                                          N_RESAMPLES, CI_LEVEL, Ce_grid, rng)
+        else:
+            results[name] = jackknife_fit(model, Ce_rows, Qe_rows, groups, fit['params'].values(), CI_LEVEL, Ce_grid)
+    return results
+
+
+def fit_dataset(job):
+    """
+    处理一个原始数据文件（进程池任务）：计算 Qe/Ce，写出 -caculated.csv，拟合所有模型。
+
+    参数:
+        job (dict): {"path", "BIOCHAR_TYPE", "POLLUTANT_NAME", "MW", "adsorbent_conc_g_L"}
+    返回:
+        dict: {"row": 汇总表中的一行, "Ce", "Qe", "Qe_std", "fits"}；读取或计算失败时 row 中带 error
+    """
+    row = {'file': os.path.basename(job['path']), **{k: v for k, v in job.items() if k != 'path'}}
+    try:
+        data, stats = calculate_qe_ce(pd.read_csv(job['path']), job['MW'], job['adsorbent_conc_g_L'])
+        data.to_csv(f"{job['path']}-caculated.csv", index=False, encoding='utf-8')
+        Ce = stats['Ce(mg/L)_mean'].to_numpy()
+        Qe = stats['Qe(mg/g)_mean'].to_numpy()
+        fits = fit_isotherms(Ce, Qe)
+        intervals = parameter_uncertainty(data, fits, UNCERTAINTY_METHOD) if UNCERTAINTY_METHOD else {}
+    except Exception as e:
+        return {'row': {**row, 'error': str(e)}, 'fits': {}}
+
+    row['n_points'] = len(Ce)
+    errors = []
+    for name, fit in fits.items():
+        if 'error' in fit:
+            errors.append(f"{name}: {fit['error']}")
+            continue
+        se = np.sqrt(np.diag(fit['covariance']))
+        for k, (param, value) in enumerate(fit['params'].items()):
+            row[f'{name}_{param}'] = value
+            row[f'{name}_{param}_SE'] = se[k]
+            if param in intervals.get(name, {}).get('params_ci', {}):
+                row[f'{name}_{param}_CI_low'], row[f'{name}_{param}_CI_high'] = intervals[name]['params_ci'][param]
+        for metric in ('R2', 'RMSE', 'MAE', 'AIC', 'BIC'):
+            row[f'{name}_{metric}'] = fit[metric]
+    row['best_model_AIC'] = best_model(fits, 'AIC')
+    row['best_model_BIC'] = best_model(fits, 'BIC')
+    if errors:
+        row['error'] = '; '.join(errors)
+    bands = {name: ci['band'] for name, ci in intervals.items() if 'band' in ci}
+    return {'row': row, 'Ce': Ce, 'Qe': Qe, 'Qe_std': stats['Qe(mg/g)_std'].to_numpy(), 'fits': fits, 'bands': bands}
+
+
+def setup_plot_style():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib import rcParams
+
+    # 启用 LaTeX 渲染
+    rcParams['text.usetex'] = True  # 启用 LaTeX 支持
+    rcParams['font.size'] = 14      # 设置字体大小
+    # 设置图表风格
+    sns.set_theme(style="darkgrid")
+    sns.set_context("talk")
+    return plt
+
+
+def plot_isotherms(result, path, show=False):
+    """绘制 "Qe-Ce" 吸附等温线与各模型拟合曲线，保存为 path-Adsorption Isotherms.png。"""
+    plt = setup_plot_style()
+    row, Ce, Qe, fits = result['row'], result['Ce'], result['Qe'], result['fits']
+    Ce_fit = curve_grid(Ce)
+
+    # draw "Qe-Ce" figure
+    plt.figure(figsize=(10,6))
+    plt.errorbar(Ce, Qe, fmt='o', ecolor='red', capsize=5,
+                yerr=result['Qe_std'], color='black', label='Experimental Data')
+
+    # 绘制各模型拟合曲线
+    styles = ['r-', 'b--', 'g-.', 'm:', 'c-', 'y--', 'k-.']
+    for name, style in zip(PLOT_MODELS, styles):
+        fit = fits.get(name, {})
+        if 'params' not in fit:
+            continue
+        model = ISOTHERM_MODELS[name]
+        with np.errstate(all='ignore'):
+            Qe_fit = model.func(Ce_fit, *fit['params'].values())
+        params = ', '.join(f'{param}={value:.3g}' for param, value in fit['params'].items())
+        if name in result.get('bands', {}):
+            Ce_band, band_lo, band_hi = result['bands'][name]
+            plt.fill_between(Ce_band, band_lo, band_hi, color=style[0], alpha=0.15, linewidth=0)
+        plt.plot(
+            Ce_fit, Qe_fit, style,
+            label=(f'{name} Fit: ${model.latex}$'
+                   f'\n${params}$'
+                   f"\n$R^2={fit['R2']:.3f}, RMSE={fit['RMSE']:.3f}, MAE={fit['MAE']:.3f}$")
+        )
+
+    plt.xlabel('Ce (mg/L)')
+    plt.ylabel('Qe (mg/g)')
+    plt.title(f"{row['BIOCHAR_TYPE']}-{row['adsorbent_conc_g_L']}g/L-{row['POLLUTANT_NAME']}-Adsorption Isotherms")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(f'{path}-Adsorption Isotherms.png', dpi=500, facecolor='white')
+    if show:
+        plt.show()
+    plt.close()
+
+
+def _plot_job(args):
+    result, path = args
+    import matplotlib
+    matplotlib.use('Agg')
+    plot_isotherms(result, path)
+
+
+def find_raw_files(pattern):
+    """RAW_CSV_GLOB 为目录时取其中所有 *-raw.csv，否则按通配符匹配；忽略本脚本生成的 -caculated.csv。"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*-raw.csv')
+    return sorted(p for p in glob.glob(pattern) if not p.endswith('-caculated.csv'))
+
+
+def load_jobs(paths, metadata_path):
+    """按文件名（或不含扩展名的文件名）在元数据表中查找每个文件的实验参数；找不到的文件抛出 KeyError。"""
+    metadata = pd.read_csv(metadata_path).set_index('file')
+    jobs = []
+    for path in paths:
+        name = os.path.basename(path)
+        key = name if name in metadata.index else os.path.splitext(name)[0]
+        if key not in metadata.index:
+            raise KeyError(f'元数据表 {metadata_path} 中缺少 {name}')
+        meta = metadata.loc[key]
+        jobs.append({
+            'path': path,
+            'BIOCHAR_TYPE': meta['BIOCHAR_TYPE'],
+            'POLLUTANT_NAME': meta['POLLUTANT_NAME'],
+            'MW': float(meta['MW']),
+            'adsorbent_conc_g_L': float(meta['adsorbent_conc_g_L']),
+        })
+    return jobs
+
+
+def run_batch(jobs, results_path=RESULTS_CSV_PATH, make_plots=MAKE_PLOTS, workers=N_WORKERS):
+    """
+    在进程池中拟合所有数据集，写出汇总参数表；make_plots 为 True 时在全部拟合完成后再并行绘图，
+    绘图不会拖慢拟合。返回汇总表（DataFrame）。
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(fit_dataset, jobs, chunksize=max(1, len(jobs) // (4 * (os.cpu_count() or 1)))))
+        table = pd.DataFrame([result['row'] for result in results])
+        table.to_csv(results_path, index=False, encoding='utf-8')
+        print(f"已拟合 {len(results)} 个数据集，参数表：{results_path}")
+
+        if make_plots:
+            plot_jobs = [(result, job['path']) for result, job in zip(results, jobs) if result['fits']]
+            list(pool.map(_plot_job, plot_jobs))
+    return table
+
+
+if __name__ == "__main__":
+    if RAW_CSV_GLOB:
+        run_batch(load_jobs(find_raw_files(RAW_CSV_GLOB), METADATA_CSV_PATH))
+    else:
+        result = fit_dataset({
+            'path': csv_file_path,
+            'BIOCHAR_TYPE': BIOCHAR_TYPE,
+            'POLLUTANT_NAME': POLLUTANT_NAME,
+            'MW': MW,
+            'adsorbent_conc_g_L': adsorbent_conc_g_L,
+        })
+        if 'error' in result['row']:
+            print(f"拟合失败: {result['row']['error']}")
+
+        # 输出结果
+        for name, fit in result['fits'].items():
+            if 'params' not in fit:
+                continue
+            print(f"{name} 拟合参数:")
+            for param, value in fit['params'].items():
+                line = f"{param} = {value:.4g} ± {result['row'][f'{name}_{param}_SE']:.2g}"
+                if f'{name}_{param}_CI_low' in result['row']:
+                    line += (f"  ({CI_LEVEL:.0%} CI: {result['row'][f'{name}_{param}_CI_low']:.4g}"
+                             f" ~ {result['row'][f'{name}_{param}_CI_high']:.4g})")
+                print(line)
+            print(f"R² = {fit['R2']:.4f}, AIC = {fit['AIC']:.2f}, BIC = {fit['BIC']:.2f}\n")
+        print(f"AIC 最优模型: {result['row'].get('best_model_AIC')}，BIC 最优模型: {result['row'].get('best_model_BIC')}")
+
+        if result['fits']:
+            plot_isotherms(result, csv_file_path, show=True)
@@ -0,0 +1,297 @@
+"""
+=======================================
+吸附等温线模型注册表
+=======================================
+📌 功能说明：
+    每个模型声明：模型函数、解析雅可比矩阵、参数边界，以及由数据估计初始值的方法
+    （多数来自模型的线性化形式），供 scipy.optimize.curve_fit 使用。
+    相比有限差分雅可比与固定的 p0，收敛所需的函数调用次数更少，难拟合的数据集失败也更少。
+    拟合结果附带 R²、RMSE、MAE 与 AIC、BIC，用于模型选择（AIC/BIC 越小越好）。
+
+📌 已注册的模型（Ce 单位 mg/L，Qe 单位 mg/g）：
+    - Langmuir:              Qe = Qmax·b·Ce / (1 + b·Ce)
+    - Freundlich:            Qe = Kf·Ce^(1/n)
+    - Sips:                  Qe = Qmax·(Ks·Ce)^ns / (1 + (Ks·Ce)^ns)
+    - Temkin:                Qe = B·ln(A·Ce)，B = RT/bT
+    - Redlich-Peterson:      Qe = KR·Ce / (1 + aR·Ce^g)，0 < g ≤ 1
+    - Toth:                  Qe = Qmax·b·Ce / (1 + (b·Ce)^t)^(1/t)
+    - Dubinin-Radushkevich:  Qe = Qm·exp(-K·ε²)，ε = RT·ln(1 + 1/Ce)（kJ/mol），E = 1/√(2K)
+
+📌 使用示例：
+    from isotherm_models import ISOTHERM_MODELS, fit_model
+    fit = fit_model(ISOTHERM_MODELS['Sips'], Ce, Qe)
+    print(fit['params'], fit['AIC'])
+
+📌 新增模型：
+    构造 IsothermModel 并调用 register_model 即可，模型函数与雅可比均需支持 numpy 逐元素广播
+    （isotherm_uncertainty.py 用它们一次拟合全部重抽样）。
+=======================================
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+R_KJ = 8.314e-3          # 气体常数 kJ/(mol·K)
+TEMPERATURE_K = 298.15   # Temkin 与 D-R 模型使用的实验温度
+
+
+@dataclass(frozen=True)
+class IsothermModel:
+    name: str
+    param_names: tuple
+    func: Callable              # func(Ce, *params) → Qe
+    jac: Callable               # jac(Ce, *params) → (len(Ce), len(params)) 的雅可比矩阵
+                                # 两者都只用逐元素运算：Ce 为 (B, n)、参数为 (B, 1) 时可一次计算 B 组参数
+    initial_guess: Callable     # initial_guess(Ce, Qe) → p0
+    bounds: tuple               # (下界列表, 上界列表)
+    latex: str                  # 图例中的公式（LaTeX）
+
+
+ISOTHERM_MODELS = {}
+
+
+def register_model(model: IsothermModel):
+    ISOTHERM_MODELS[model.name] = model
+    return model
+
+
+def stack_jacobian(columns):
+    """把各参数的偏导按最后一维堆叠为雅可比矩阵（兼容批量参数广播）。"""
+    return np.stack(np.broadcast_arrays(*columns), axis=-1)
+
+
+def _safe_log(x):
+    """x ≤ 0 处取 0，供雅可比中 x^p·ln(x) 一类的项在 x = 0 时取极限值 0。"""
+    return np.log(np.where(x > 0, x, 1.0))
+
+
+def _linear_fit(x, y):
+    """最小二乘直线 y = slope·x + intercept；点数不足或 x 无变化时返回 None。"""
+    mask = np.isfinite(x) & np.isfinite(y)
+    if mask.sum() < 2 or np.ptp(x[mask]) == 0:
+        return None
+    slope, intercept = np.polyfit(x[mask], y[mask], 1)
+    return slope, intercept
+
+
+def _langmuir_guess(Ce, Qe):
+    """由线性化 Ce/Qe = Ce/Qmax + 1/(Qmax·b) 估计 (Qmax, b)，结果不合理时回退到 (max(Qe), 1/median(Ce))。"""
+    Qmax, b = max(Qe), 1 / np.median(Ce)
+    line = _linear_fit(Ce, Ce / Qe)
+    if line is not None and line[0] > 0 and line[1] > 0:
+        Qmax, b = 1 / line[0], line[0] / line[1]
+    return Qmax, b
+
+
+# --- Langmuir ---
+
+def langmuir_model(Ce, Qmax, b):
+    return (Qmax * b * Ce) / (1 + b * Ce)
+
+def langmuir_jac(Ce, Qmax, b):
+    d = 1 + b * Ce
+    return stack_jacobian([b * Ce / d, Qmax * Ce / d**2])
+
+register_model(IsothermModel(
+    'Langmuir', ('Qmax', 'b'), langmuir_model, langmuir_jac,
+    lambda Ce, Qe: list(_langmuir_guess(Ce, Qe)),
+    ([0, 0], [np.inf, np.inf]),
+    r'Q_e = \frac{Q_{\mathrm{max}} \cdot b \cdot C_e}{1 + b \cdot C_e}',
+))
+
+
+# --- Freundlich ---
+
+def freundlich_model(Ce, Kf, n):
+    return Kf * Ce**(1/n)
+
+def freundlich_jac(Ce, Kf, n):
+    power = Ce**(1/n)
+    return stack_jacobian([power, -Kf * power * _safe_log(Ce) / n**2])
+
+def _freundlich_guess(Ce, Qe):
+    """由 ln Qe = ln Kf + (1/n)·ln Ce 估计 (Kf, n)。"""
+    line = _linear_fit(np.log(Ce), np.log(Qe))
+    if line is None or line[0] <= 0:
+        return [np.mean(Qe), 1]
+    return [np.exp(line[1]), 1 / line[0]]
+
+register_model(IsothermModel(
+    'Freundlich', ('Kf', 'n'), freundlich_model, freundlich_jac, _freundlich_guess,
+    ([0, 0.05], [np.inf, np.inf]),
+    r'Q_e = K_f \cdot C_e^{1/n}',
+))
+
+
+# --- Sips ---
+
+def sips_model(Ce, Qmax, Ks, ns):
+    u = (Ks * Ce)**ns
+    return Qmax * u / (1 + u)
+
+def sips_jac(Ce, Qmax, Ks, ns):
+    u = (Ks * Ce)**ns
+    dq_du = Qmax / (1 + u)**2
+    return stack_jacobian([u / (1 + u), dq_du * ns * u / Ks, dq_du * u * _safe_log(Ks * Ce)])
+
+register_model(IsothermModel(
+    'Sips', ('Qmax', 'Ks', 'ns'), sips_model, sips_jac,
+    lambda Ce, Qe: [*_langmuir_guess(Ce, Qe), 1],
+    ([0, 0, 0.05], [np.inf, np.inf, 10]),
+    r'Q_e = \frac{Q_{\mathrm{max}} (K_s C_e)^{n_s}}{1 + (K_s C_e)^{n_s}}',
+))
+
+
+# --- Temkin ---
+
+def temkin_model(Ce, B, A):
+    return B * np.log(A * Ce)
+
+def temkin_jac(Ce, B, A):
+    return stack_jacobian([np.log(A * Ce), B / A * np.ones_like(Ce)])
+
+def _temkin_guess(Ce, Qe):
+    """由 Qe = B·ln A + B·ln Ce 估计 (B, A)。"""
+    line = _linear_fit(np.log(Ce), Qe)
+    if line is None or line[0] <= 0:
+        return [np.mean(Qe), 1 / np.min(Ce)]
+    return [line[0], np.exp(line[1] / line[0])]
+
+register_model(IsothermModel(
+    'Temkin', ('B', 'A'), temkin_model, temkin_jac, _temkin_guess,
+    ([0, 0], [np.inf, np.inf]),
+    r'Q_e = B \ln(A \cdot C_e)',
+))
+
+
+# --- Redlich-Peterson ---
+
+def redlich_peterson_model(Ce, KR, aR, g):
+    return KR * Ce / (1 + aR * Ce**g)
+
+def redlich_peterson_jac(Ce, KR, aR, g):
+    power = Ce**g
+    d = 1 + aR * power
+    return stack_jacobian([Ce / d, -KR * Ce * power / d**2, -KR * Ce * aR * power * _safe_log(Ce) / d**2])
+
+def _redlich_peterson_guess(Ce, Qe):
+    Qmax, b = _langmuir_guess(Ce, Qe)
+    return [Qmax * b, b, 0.9]
+
+register_model(IsothermModel(
+    'Redlich-Peterson', ('KR', 'aR', 'g'), redlich_peterson_model, redlich_peterson_jac, _redlich_peterson_guess,
+    ([0, 0, 0], [np.inf, np.inf, 1]),
+    r'Q_e = \frac{K_R C_e}{1 + a_R C_e^{g}}',
+))
+
+
+# --- Toth ---
+
+def toth_model(Ce, Qmax, b, t):
+    v = b * Ce
+    return Qmax * v / (1 + v**t)**(1/t)
+
+def toth_jac(Ce, Qmax, b, t):
+    v = b * Ce
+    vt = v**t
+    s = 1 + vt
+    q = Qmax * v / s**(1/t)
+    return stack_jacobian([
+        v / s**(1/t),
+        Qmax * Ce / s**(1/t) / s,
+        q * (np.log(s) / t**2 - vt * _safe_log(v) / (t * s)),
+    ])
+
+register_model(IsothermModel(
+    'Toth', ('Qmax', 'b', 't'), toth_model, toth_jac,
+    lambda Ce, Qe: [*_langmuir_guess(Ce, Qe), 1],
+    ([0, 0, 0.05], [np.inf, np.inf, 10]),
+    r'Q_e = \frac{Q_{\mathrm{max}} b C_e}{[1 + (b C_e)^t]^{1/t}}',
+))
+
+
+# --- Dubinin-Radushkevich ---
+
+def polanyi_potential(Ce):
+    """Polanyi 吸附势 ε = RT·ln(1 + 1/Ce)，单位 kJ/mol。"""
+    return R_KJ * TEMPERATURE_K * np.log1p(1 / Ce)
+
+def dubinin_radushkevich_model(Ce, Qm, K):
+    return Qm * np.exp(-K * polanyi_potential(Ce)**2)
+
+def dubinin_radushkevich_jac(Ce, Qm, K):
+    eps2 = polanyi_potential(Ce)**2
+    e = np.exp(-K * eps2)
+    return stack_jacobian([e, -Qm * eps2 * e])
+
+def _dubinin_radushkevich_guess(Ce, Qe):
+    """由 ln Qe = ln Qm - K·ε² 估计 (Qm, K)。"""
+    line = _linear_fit(polanyi_potential(Ce)**2, np.log(Qe))
+    if line is None or line[0] >= 0:
+        return [max(Qe), 0.1]
+    return [np.exp(line[1]), -line[0]]
+
+register_model(IsothermModel(
+    'Dubinin-Radushkevich', ('Qm', 'K'), dubinin_radushkevich_model, dubinin_radushkevich_jac,
+    _dubinin_radushkevich_guess,
+    ([0, 0], [np.inf, np.inf]),
+    r'Q_e = Q_m \exp(-K \varepsilon^2)',
+))
+
+
+def information_criteria(residuals, n_params):
+    """最小二乘拟合的 AIC = n·ln(RSS/n) + 2k 与 BIC = n·ln(RSS/n) + k·ln(n)。"""
+    n = len(residuals)
+    rss = max(float(np.sum(residuals**2)), np.finfo(float).tiny)
+    base = n * np.log(rss / n)
+    return base + 2 * n_params, base + n_params * np.log(n)
+
+
+def fit_model(model: IsothermModel, Ce, Qe):
+    """
+    用解析雅可比和边界拟合一个模型。
+
+    返回:
+        dict: {"params": {参数名: 值}, "covariance", "R2", "RMSE", "MAE", "AIC", "BIC", "nfev"}；
+            拟合失败时为 {"error": 原因}
+    """
+    Ce = np.asarray(Ce, dtype=float)
+    Qe = np.asarray(Qe, dtype=float)
+    lower, upper = (np.asarray(b, dtype=float) for b in model.bounds)
+    try:
+        with np.errstate(all='ignore'):
+            # 初始值必须在边界内
+            p0 = np.asarray(model.initial_guess(Ce, Qe), dtype=float)
+            p0 = np.clip(np.nan_to_num(p0, nan=1.0, posinf=1.0, neginf=1.0), lower, upper)
+            p0 = np.where(p0 <= lower, lower + 1e-6, p0)
+            params, covariance, info, _, _ = curve_fit(
+                model.func, Ce, Qe, p0=p0, jac=model.jac, bounds=model.bounds, full_output=True,
+            )
+            Qe_predict = model.func(Ce, *params)
+    except (RuntimeError, ValueError) as e:
+        return {'error': str(e)}
+    if not np.all(np.isfinite(Qe_predict)):
+        return {'error': 'fitted curve is not finite'}
+
+    residuals = Qe - Qe_predict
+    aic, bic = information_criteria(residuals, len(params))
+    ss_tot = np.sum((Qe - Qe.mean())**2)
+    return {
+        'params': dict(zip(model.param_names, params)),
+        'covariance': covariance,
+        'R2': 1 - np.sum(residuals**2) / ss_tot if ss_tot > 0 else np.nan,
+        'RMSE': np.sqrt(np.mean(residuals**2)),
+        'MAE': np.mean(np.abs(residuals)),
+        'AIC': aic,
+        'BIC': bic,
+        'nfev': info.get('nfev'),
+    }
+
+
+def best_model(fits, criterion='AIC'):
+    """在拟合成功的模型中按 AIC 或 BIC 选出最优模型名；都失败时返回 None。"""
+    scores = {name: fit[criterion] for name, fit in fits.items() if criterion in fit}
+    return min(scores, key=scores.get) if scores else None
@@ -0,0 +1,223 @@
+"""
+=======================================
+等温线参数的 Bootstrap / Jackknife 置信区间
+=======================================
+📌 功能说明：
+    以每个初始浓度下的平行样为单位重抽样：
+    - bootstrap：每个初始浓度组内有放回地抽取同样数量的平行样，重新求组均值 (Ce, Qe) 后重新拟合；
+      所有重抽样的下标一次性用 NumPy 生成，组均值按矩阵运算得到；全部重抽样以全数据的参数为初值，
+      用解析雅可比做批量 Levenberg-Marquardt 同时拟合（未收敛的再逐个用 curve_fit）。
+      7 个模型各 1000 次重抽样全部收敛时约 0.2 秒；每个回退到 curve_fit 的重抽样另需约 20 毫秒，
+      回退较多的数据集每个需要数秒
+    - jackknife：每次去掉一个平行样重新拟合，由伪值方差给出标准误，按正态近似给出区间
+    参数区间之外，还给出拟合曲线的逐点区间（用于绘制阴影带）。
+
+📌 使用示例：
+    from isotherm_models import ISOTHERM_MODELS, fit_model
+    from isotherm_uncertainty import bootstrap_fit
+    fit = fit_model(ISOTHERM_MODELS['Langmuir'], Ce, Qe)
+    ci = bootstrap_fit(ISOTHERM_MODELS['Langmuir'], Ce_rows, Qe_rows, groups, fit['params'].values())
+    print(ci['params_ci'])
+=======================================
+"""
+
+import warnings
+
+import numpy as np
+from scipy.optimize import curve_fit
+from scipy.stats import norm
+
+DEFAULT_RESAMPLES = 1000
+DEFAULT_LEVEL = 0.95
+
+
+def bootstrap_group_means(Ce_rows, Qe_rows, groups, n_resamples=DEFAULT_RESAMPLES, rng=None):
+    """
+    组内有放回重抽样，返回每次重抽样的组均值。
+
+    参数:
+        Ce_rows, Qe_rows: 每个平行样（每行数据）的 Ce 与 Qe
+        groups: 每行所属的组（初始浓度）
+    返回:
+        (Ce_samples, Qe_samples): 形状均为 (n_resamples, 组数)，列按组排序
+    """
+    rng = np.random.default_rng(rng)
+    Ce_rows, Qe_rows, groups = (np.asarray(a) for a in (Ce_rows, Qe_rows, groups))
+    labels = np.unique(groups)
+    Ce_samples = np.empty((n_resamples, len(labels)))
+    Qe_samples = np.empty((n_resamples, len(labels)))
+    for j, label in enumerate(labels):
+        members = np.flatnonzero(groups == label)
+        picks = members[rng.integers(0, len(members), size=(n_resamples, len(members)))]
+        Ce_samples[:, j] = Ce_rows[picks].mean(axis=1)
+        Qe_samples[:, j] = Qe_rows[picks].mean(axis=1)
+    return Ce_samples, Qe_samples
+
+
+def jackknife_group_means(Ce_rows, Qe_rows, groups):
+    """每次去掉一行（一个平行样）后的组均值；只有一个平行样的组不做删除。形状同 bootstrap_group_means。"""
+    Ce_rows = np.asarray(Ce_rows, dtype=float)
+    Qe_rows = np.asarray(Qe_rows, dtype=float)
+    labels, codes = np.unique(groups, return_inverse=True)
+    counts = np.bincount(codes, minlength=len(labels))
+    Ce_sum = np.bincount(codes, Ce_rows, minlength=len(labels))
+    Qe_sum = np.bincount(codes, Qe_rows, minlength=len(labels))
+
+    deletable = np.flatnonzero(counts[codes] > 1)
+    Ce_samples = np.tile(Ce_sum / counts, (len(deletable), 1))
+    Qe_samples = np.tile(Qe_sum / counts, (len(deletable), 1))
+    rows = np.arange(len(deletable))
+    group = codes[deletable]
+    Ce_samples[rows, group] = (Ce_sum[group] - Ce_rows[deletable]) / (counts[group] - 1)
+    Qe_samples[rows, group] = (Qe_sum[group] - Qe_rows[deletable]) / (counts[group] - 1)
+    return Ce_samples, Qe_samples
+
+
+def batch_least_squares(model, Ce_samples, Qe_samples, p0, max_iter=100, gtol=1e-6, xtol=1e-10):
+    """
+    向量化的 Levenberg-Marquardt：所有重抽样同时迭代，每步只做一次批量的模型/雅可比计算和
+    B 个 k×k 线性方程组求解。参数限制在模型边界内，停在边界上且梯度指向边界外的参数在该步固定。
+    Ce ≤ 0 或 Qe 非有限的点不参与该次拟合（点数不同的样本可用 NaN 补齐）；p0 可以是所有样本共用的
+    (k,)，也可以是每个样本各自的 (B, k)。
+
+    收敛判据：残差与雅可比各列夹角的余弦都不超过 gtol（到达极小点），或阻尼较小时的相对步长不超过 xtol。
+
+    返回:
+        (params, converged): 形状 (B, k) 的参数与 (B,) 的收敛标记；数值失败的行为 NaN
+    """
+    lower, upper = (np.asarray(b, dtype=float) for b in model.bounds)
+    # 下界为 0 的参数（多在分母或对数中）保持严格为正
+    lower = np.where(lower == 0, 1e-12, lower)
+    mask = (Ce_samples > 0) & np.isfinite(Qe_samples)
+    Ce = np.where(mask, Ce_samples, 1.0)
+    Qe = np.where(mask, Qe_samples, 0.0)
+    n_samples, k = len(Ce), len(lower)
+    eye = np.eye(k)
+    params = np.broadcast_to(np.clip(np.asarray(p0, dtype=float), lower, upper), (n_samples, k)).copy()
+
+    def cost_of(p):
+        residuals = np.where(mask, model.func(Ce, *p.T[:, :, None]) - Qe, 0.0)
+        return residuals, np.sum(residuals**2, axis=1)
+
+    with np.errstate(all='ignore'):
+        residuals, cost = cost_of(params)
+        damping = np.full(n_samples, 1e-3)
+        converged = np.zeros(n_samples, dtype=bool)
+        for _ in range(max_iter):
+            J = np.where(mask[:, :, None], model.jac(Ce, *params.T[:, :, None]), 0.0)
+            gradient = np.einsum('bni,bn->bi', J, residuals)
+            # 固定停在边界上、下降方向指向边界外的参数
+            free = ~(((params <= lower) & (gradient > 0)) | ((params >= upper) & (gradient < 0)))
+            J = J * free[:, None, :]
+            gradient = gradient * free
+
+            column_norms = np.sqrt(np.einsum('bni,bni->bi', J, J))
+            cosine = np.abs(gradient) / (column_norms * np.sqrt(cost)[:, None] + 1e-300)
+            converged |= np.all(cosine <= gtol, axis=1)
+            if converged.all():
+                break
+
+            JTJ = np.einsum('bni,bnj->bij', J, J)
+            A = JTJ + damping[:, None, None] * (JTJ * eye) + (~free[:, :, None] * eye + 1e-12 * eye)
+            try:
+                step = -np.linalg.solve(A, gradient[:, :, None])[:, :, 0]
+            except np.linalg.LinAlgError:
+                step = -(np.linalg.pinv(A) @ gradient[:, :, None])[:, :, 0]
+            trial = np.clip(params + step, lower, upper)
+            trial_residuals, trial_cost = cost_of(trial)
+
+            better = np.isfinite(trial_cost) & (trial_cost <= cost) & ~converged
+            small_step = np.all(np.abs(trial - params) <= xtol * (np.abs(params) + xtol), axis=1)
+            converged |= better & small_step & (damping <= 1)
+            params[better] = trial[better]
+            residuals[better] = trial_residuals[better]
+            cost[better] = trial_cost[better]
+            damping = np.clip(np.where(better, damping / 3, damping * 4), 1e-12, 1e12)
+
+    params[~np.all(np.isfinite(params), axis=1) | ~np.isfinite(cost)] = np.nan
+    return params, converged
+
+
+def refit_samples(model, Ce_samples, Qe_samples, p_hat):
+    """
+    以 p_hat 为初值拟合所有重抽样，返回 (n_samples, 参数数) 的参数矩阵，失败的行为 NaN。
+    先用 batch_least_squares 一次拟合全部样本，未收敛的样本再逐个交给 curve_fit。
+    """
+    lower, upper = (np.asarray(b, dtype=float) for b in model.bounds)
+    p0 = np.clip(np.asarray(list(p_hat), dtype=float), lower, upper)
+    Ce_samples = np.asarray(Ce_samples, dtype=float)
+    Qe_samples = np.asarray(Qe_samples, dtype=float)
+    params, converged = batch_least_squares(model, Ce_samples, Qe_samples, p0)
+    with np.errstate(all='ignore'):
+        for i in np.flatnonzero(~converged):
+            mask = (Ce_samples[i] > 0) & np.isfinite(Qe_samples[i])
+            params[i] = np.nan
+            if mask.sum() < len(p0):
+                continue
+            try:
+                params[i], _ = curve_fit(model.func, Ce_samples[i][mask], Qe_samples[i][mask], p0=p0,
+                                         jac=model.jac, bounds=model.bounds)
+            except (RuntimeError, ValueError):
+                pass
+    return params
+
+
+def curve_samples(model, params, Ce_grid):
+    """对每组参数在 Ce_grid 上计算拟合曲线（模型函数按元素广播），返回 (n_samples, len(Ce_grid))。"""
+    with np.errstate(all='ignore'):
+        return model.func(np.asarray(Ce_grid)[None, :], *(params[:, [k]] for k in range(params.shape[1])))
+
+
+def bootstrap_fit(model, Ce_rows, Qe_rows, groups, p_hat, n_resamples=DEFAULT_RESAMPLES,
+                  level=DEFAULT_LEVEL, Ce_grid=None, rng=None):
+    """
+    Bootstrap 百分位置信区间。
+
+    返回:
+        dict: {"params_ci": {参数名: (下限, 上限)}, "params_se": {参数名: 标准误}, "n_success": 成功拟合次数,
+               "band": (Ce_grid, 曲线下限, 曲线上限)（给出 Ce_grid 时）}
+    """
+    Ce_samples, Qe_samples = bootstrap_group_means(Ce_rows, Qe_rows, groups, n_resamples, rng)
+    params = refit_samples(model, Ce_samples, Qe_samples, p_hat)
+    params = params[np.all(np.isfinite(params), axis=1)]
+    alpha = (1 - level) / 2
+    result = {'n_success': len(params)}
+    if not len(params):
+        return result
+    lo, hi = np.percentile(params, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    result['params_ci'] = {name: (lo[k], hi[k]) for k, name in enumerate(model.param_names)}
+    result['params_se'] = dict(zip(model.param_names, params.std(axis=0, ddof=1)))
+    if Ce_grid is not None:
+        curves = curve_samples(model, params, Ce_grid)
+        # 模型在某些 Ce（如 Ce = 0）处无定义时该列全为 NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            band_lo, band_hi = np.nanpercentile(curves, [100 * alpha, 100 * (1 - alpha)], axis=0)
+        result['band'] = (np.asarray(Ce_grid), band_lo, band_hi)
+    return result
+
+
+def jackknife_fit(model, Ce_rows, Qe_rows, groups, p_hat, level=DEFAULT_LEVEL, Ce_grid=None):
+    """
+    Jackknife 置信区间：标准误 se = sqrt((n-1)/n · Σ(θ_i - θ̄)²)，区间为 θ̂ ± z·se。返回格式同 bootstrap_fit。
+    """
+    p_hat = np.asarray(list(p_hat), dtype=float)
+    Ce_samples, Qe_samples = jackknife_group_means(Ce_rows, Qe_rows, groups)
+    params = refit_samples(model, Ce_samples, Qe_samples, p_hat)
+    params = params[np.all(np.isfinite(params), axis=1)]
+    n = len(params)
+    result = {'n_success': n}
+    if n < 2:
+        return result
+    z = norm.ppf(1 - (1 - level) / 2)
+    se = np.sqrt((n - 1) / n * np.sum((params - params.mean(axis=0))**2, axis=0))
+    result['params_ci'] = {name: (p_hat[k] - z * se[k], p_hat[k] + z * se[k]) for k, name in enumerate(model.param_names)}
+    result['params_se'] = dict(zip(model.param_names, se))
+    if Ce_grid is not None:
+        curves = curve_samples(model, params, Ce_grid)
+        center = curve_samples(model, p_hat[None, :], Ce_grid)[0]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            curve_se = np.sqrt((n - 1) / n * np.nansum((curves - np.nanmean(curves, axis=0))**2, axis=0))
+        result['band'] = (np.asarray(Ce_grid), center - z * curve_se, center + z * curve_se)
+    return result
@@ -0,0 +1,49 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adsorption_kinetics_fitting import KINETIC_MODELS, batch_metrics, fit_kinetics, results_table
+
+
+def _samples():
+    """三个样品：符合 PFO 的完整数据、全为 NaN、只有两个有效点（不多于参数个数）。"""
+    t = np.array([
+        [0, 5, 10, 20, 30, 60, 90, 120],
+        [np.nan] * 8,
+        [0, 5, 10] + [np.nan] * 5,
+    ], dtype=float)
+    qt = np.full_like(t, np.nan)
+    qt[0] = 20 * (1 - np.exp(-0.1 * t[0])) + np.array([0, 0.1, -0.1, 0.05, -0.05, 0.1, -0.1, 0])
+    qt[2, :3] = [0, 5, 8]
+    return t, qt
+
+
+def test_batch_metrics_returns_nan_without_warnings_for_too_few_points():
+    t, qt = _samples()
+    params = np.tile([20.0, 0.1], (len(t), 1))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        metrics = batch_metrics(KINETIC_MODELS['PFO'], t, qt, params)
+    for name, values in metrics.items():
+        assert np.isfinite(values[0]), name
+        assert np.isnan(values[1:]).all(), name
+
+
+def test_fit_kinetics_skips_samples_without_enough_points():
+    t, qt = _samples()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        fits = fit_kinetics(t, qt)
+        table = results_table(pd.DataFrame({'sample': ['good', 'empty', 'short']}), fits)
+
+    np.testing.assert_allclose(fits['PFO']['params'][0], [20, 0.1], rtol=0.02)
+    for fit in fits.values():
+        assert np.isnan(fit['params'][1:]).all()
+        assert np.isnan(fit['AIC'][1:]).all()
+    assert table.loc[0, 'best_model_AIC'] == 'PFO'
+    assert table.loc[1:, 'best_model_AIC'].isna().all()
@@ -0,0 +1,225 @@
+# /// script
+# dependencies = [
+#   "requests",
+#   "httpx[http2]",
+# ]
+# ///
+
+"""
+B站字幕的 asyncio 接口（基于连接池化的 httpx.AsyncClient）。
+
+与 fetch_bilibili_subtitle_content.py 的同步函数一一对应，但多P视频的各分P 字幕列表并行获取，
+选中的字幕正文也并发下载，50 个分P 的课程只需大约几次请求的时间。
+
+示例:
+    async with BilibiliClient() as client:
+        parts = await client.fetch_video_text("https://www.bilibili.com/video/BV1xxxxxxx", all_pages=True)
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+
+from bilibili_cache import BilibiliCache
+from config import BILIBILI_HEADERS
+from fetch_bilibili_subtitle_content import choose_subtitle, page_cid, parse_video_url
+
+API_BASE = 'https://api.bilibili.com'
+VIEW_PATH = '/x/web-interface/view'
+PLAYER_PATH = '/x/player/wbi/v2'
+DEFAULT_CONCURRENCY = 8    # 同时进行的请求数
+DEFAULT_TIMEOUT = 10
+
+
+class BilibiliClient:
+    """
+    异步B站客户端：所有请求共用一个 HTTP/2 连接池，并发数由信号量限制，可选全局限速。
+    api_base 可指向本地的模拟接口用于测试；字幕正文与短链接使用其自身的绝对地址。
+    传入 cache（BilibiliCache）时，短链接、视频信息、字幕列表与字幕正文先查缓存，命中则不发请求。
+    """
+
+    def __init__(
+        self,
+        headers: dict = BILIBILI_HEADERS,
+        api_base: str = API_BASE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_limit: float = 0,
+        timeout: float = DEFAULT_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache: BilibiliCache | None = None,
+    ):
+        self.client = httpx.AsyncClient(
+            base_url=api_base,
+            headers=headers,
+            http2=api_base.startswith('https:'),
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            transport=transport,
+        )
+        self.cache = cache
+        self.rate_limit = rate_limit
+        self.request_count = 0    # 实际发出的请求数（缓存命中不计）
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_lock = asyncio.Lock()
+        self._last = float('-inf')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _get(self, url: str, params: dict | None = None) -> httpx.Response:
+        if self.rate_limit > 0:
+            async with self._rate_lock:
+                delay = self._last + self.rate_limit - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._last = time.monotonic()
+        self.request_count += 1
+        async with self._semaphore:
+            return await self.client.get(url, params=params)
+
+    async def _api(self, url: str, params: dict) -> dict | None:
+        """请求 B 站 JSON 接口，成功（code == 0）时返回 data，否则打印错误并返回 None。"""
+        payload = (await self._get(url, params)).json()
+        if payload.get('code') != 0 or not payload.get('data'):
+            print('B站接口请求失败:', url, payload.get('message'), file=sys.stderr)
+            return None
+        return payload['data']
+
+    async def resolve_video_url(self, video_url: str) -> str:
+        """展开 b23.tv 短链接，其余链接原样返回。"""
+        if not video_url.startswith(('https://b23.tv/', 'http://b23.tv/')):
+            return video_url
+        target = self.cache.get_short_link(video_url) if self.cache else None
+        if target is None:
+            target = str((await self._get(video_url)).url)
+            if self.cache:
+                self.cache.put_short_link(video_url, target)
+        return target
+
+    async def fetch_video_view(self, bvid: str) -> dict | None:
+        view = self.cache.get_view(bvid) if self.cache else None
+        if view is None:
+            view = await self._api(VIEW_PATH, {'bvid': bvid})
+            if self.cache and view is not None:
+                self.cache.put_view(bvid, view)
+        return view
+
+    async def fetch_subtitle_list(self, aid: int, cid: int) -> list[dict]:
+        """获取某个分P 的字幕列表（不含正文），格式同 fetch_bilibili_subtitles。"""
+        cached = self.cache.get_subtitle_list(aid, cid) if self.cache else None
+        if cached is not None:
+            return cached
+        player_data = (await self._get(PLAYER_PATH, {'aid': aid, 'cid': cid})).json()
+        subtitles = (player_data.get('data') or {}).get('subtitle', {}).get('subtitles') or []
+        result = []
+        for idx, sub in enumerate(subtitles):
+            lan = sub.get('lan', '')
+            result.append({
+                'id': sub.get('id', idx),
+                'lan': lan,
+                'lan_doc': sub.get('lan_doc'),
+                'subtitle_url': sub.get('subtitle_url'),
+                'isAI': lan.startswith('ai-'),
+                'isCC': not lan.startswith('ai-'),
+            })
+        if self.cache and result:
+            self.cache.put_subtitle_list(aid, cid, result)
+        return result
+
+    async def fetch_subtitle_body(self, url: str) -> list[dict]:
+        """获取单条字幕的 body（[{"from", "to", "content"}, ...]），失败时抛出异常。"""
+        body = self.cache.get_subtitle_body(url) if self.cache else None
+        if body is None:
+            body = (await self._get('https:' + url if url.startswith('//') else url)).json()['body']
+            if self.cache:
+                self.cache.put_subtitle_body(url, body)
+        return body
+
+    async def fetch_subtitles(self, video_url: str) -> list[dict]:
+        """fetch_bilibili_subtitles 的异步版本：获取链接所指分P 的字幕列表。"""
+        bvid, page = parse_video_url(await self.resolve_video_url(video_url))
+        if not bvid:
+            print('无法获取 bvid', file=sys.stderr)
+            return []
+        view = await self.fetch_video_view(bvid)
+        if view is None:
+            return []
+        return await self.fetch_subtitle_list(view['aid'], page_cid(view, page))
+
+    async def fetch_subtitle_content(self, url: str) -> str:
+        """fetch_bilibili_subtitle_content 的异步版本。"""
+        return ", ".join(item.get('content', '') for item in await self.fetch_subtitle_body(url))
+
+    async def _fetch_part(self, video_url: str, view: dict, part: dict) -> dict:
+        record = {
+            'url': video_url, 'bvid': view['bvid'], 'page': part['page'],
+            'title': view.get('title'), 'part': part.get('part'),
+        }
+        try:
+            subs = await self.fetch_subtitle_list(view['aid'], part['cid'])
+            sub = choose_subtitle(subs)
+            if sub is None:
+                return {**record, 'error': '未找到中英文字幕' if subs else '未找到字幕'}
+            body = await self.fetch_subtitle_body(sub['subtitle_url'])
+            return {**record, 'lan_doc': sub['lan_doc'], 'body': body}
+        except Exception as e:
+            # 网络或接口异常，与"没有字幕"不同，重试可能成功
+            return {**record, 'error': str(e) or type(e).__name__, 'retryable': True}
+
+    async def fetch_video_text(self, video_url: str, all_pages: bool = False) -> list[dict]:
+        """
+        获取视频字幕：只请求一次视频信息，各分P 的字幕列表与正文并发获取。
+
+        参数:
+            video_url (str): 视频链接或 b23.tv 短链接。
+            all_pages (bool): 为 True 时处理全部分P，否则只处理链接中的分P。
+        返回:
+            list[dict]: 每个分P 一条 {"url", "bvid", "page", "title", "part", "lan_doc", "body"}，
+                body 为字幕条目列表；失败时带 "error" 字段，网络或接口异常导致的失败另带 "retryable": True。
+        """
+        url = await self.resolve_video_url(video_url)
+        bvid, page = parse_video_url(url)
+        if not bvid:
+            return [{'url': video_url, 'error': '无法获取 bvid'}]
+        view = await self.fetch_video_view(bvid)
+        if view is None:
+            return [{'url': video_url, 'bvid': bvid, 'error': f'获取视频信息失败: {bvid}'}]
+        view.setdefault('bvid', bvid)
+        parts = view.get('pages') or [{'page': 1, 'cid': view.get('cid'), 'part': ''}]
+        if not all_pages:
+            parts = [p for p in parts if p.get('page') == page] or [{'page': page, 'cid': page_cid(view, page), 'part': ''}]
+        return list(await asyncio.gather(*(self._fetch_part(video_url, view, p) for p in parts)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='并发获取B站视频字幕（asyncio），每个分P 输出一行 JSON')
+    parser.add_argument('VIDEO_URL', nargs='+', help='B站视频链接')
+    parser.add_argument('--all-pages', action='store_true', help='处理多P视频的全部分P')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help=f'同时进行的请求数（默认 {DEFAULT_CONCURRENCY}）')
+    parser.add_argument('--rate-limit', type=float, default=0, help='相邻两次请求的最小间隔秒数（默认不限速）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用本地缓存')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else BilibiliCache()
+    async with BilibiliClient(concurrency=args.concurrency, rate_limit=args.rate_limit, cache=cache) as client:
+        tasks = [client.fetch_video_text(url, args.all_pages) for url in args.VIDEO_URL]
+        for parts in asyncio.as_completed(tasks):
+            for part in await parts:
+                if 'body' in part:
+                    part['content'] = ", ".join(item.get('content', '') for item in part.pop('body'))
+                print(json.dumps(part, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+B站元数据与字幕的本地 SQLite 缓存。
+
+- b23.tv 短链接 → 展开后的链接：永久缓存
+- bvid → 视频信息（aid、标题、各分P 的 cid）：永久缓存，(bvid, 分P) → (aid, cid) 由此得出
+- (aid, cid) → 字幕列表：有 TTL（AI 字幕可能稍后才生成，字幕地址中的鉴权参数也会过期）
+- 字幕地址（去掉协议与查询参数）→ 字幕正文：字幕内容不会变化，永久缓存
+
+同步脚本的线程池与异步客户端都可以共用同一个实例（内部加锁）。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "bilibili-subtitles", "cache.sqlite")
+DEFAULT_LIST_TTL = 6 * 3600  # 字幕列表的有效期（秒）
+
+# 视频信息中需要保存的字段
+_VIEW_FIELDS = ("bvid", "aid", "cid", "title", "pages")
+
+
+def subtitle_key(url: str) -> str:
+    """字幕正文的缓存键：去掉协议和查询参数（如会过期的 auth_key），只保留主机与路径。"""
+    parts = urlsplit(url if "//" in url else "//" + url)
+    return parts.netloc + parts.path
+
+
+class BilibiliCache:
+    """
+    示例:
+        cache = BilibiliCache()
+        view = cache.get_view(bvid)
+        if view is None:
+            view = fetch_video_view(bvid)
+            cache.put_view(bvid, view)
+    """
+
+    def __init__(self, path: str | None = None, list_ttl: float = DEFAULT_LIST_TTL):
+        self.path = path or os.environ.get("BILIBILI_CACHE", DEFAULT_CACHE_PATH)
+        self.list_ttl = list_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS short_links (url TEXT PRIMARY KEY, target TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS views (bvid TEXT PRIMARY KEY, view TEXT NOT NULL)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS subtitle_lists ("
+                "aid INTEGER, cid INTEGER, subtitles TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (aid, cid))"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS subtitle_bodies (key TEXT PRIMARY KEY, body TEXT NOT NULL)")
+
+    def _one(self, sql: str, params: tuple):
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock, self._db:
+            self._db.execute(sql, params)
+
+    def get_short_link(self, url: str) -> str | None:
+        row = self._one("SELECT target FROM short_links WHERE url = ?", (url,))
+        return row[0] if row else None
+
+    def put_short_link(self, url: str, target: str):
+        self._write("INSERT OR REPLACE INTO short_links (url, target) VALUES (?, ?)", (url, target))
+
+    def get_view(self, bvid: str) -> dict | None:
+        row = self._one("SELECT view FROM views WHERE bvid = ?", (bvid,))
+        return json.loads(row[0]) if row else None
+
+    def put_view(self, bvid: str, view: dict):
+        """只保存 aid、cid、标题与分P 列表。"""
+        view = {k: view[k] for k in _VIEW_FIELDS if k in view}
+        self._write("INSERT OR REPLACE INTO views (bvid, view) VALUES (?, ?)", (bvid, json.dumps(view, ensure_ascii=False)))
+
+    def get_subtitle_list(self, aid: int, cid: int) -> list[dict] | None:
+        row = self._one(
+            "SELECT subtitles FROM subtitle_lists WHERE aid = ? AND cid = ? AND fetched_at > ?",
+            (aid, cid, time.time() - self.list_ttl),
+        )
+        return json.loads(row[0]) if row else None
+
+    def put_subtitle_list(self, aid: int, cid: int, subtitles: list[dict]):
+        self._write(
+            "INSERT OR REPLACE INTO subtitle_lists (aid, cid, subtitles, fetched_at) VALUES (?, ?, ?, ?)",
+            (aid, cid, json.dumps(subtitles, ensure_ascii=False), time.time()),
+        )
+
+    def get_subtitle_body(self, url: str) -> list[dict] | None:
+        row = self._one("SELECT body FROM subtitle_bodies WHERE key = ?", (subtitle_key(url),))
+        return json.loads(row[0]) if row else None
+
+    def put_subtitle_body(self, url: str, body: list[dict]):
+        self._write(
+            "INSERT OR REPLACE INTO subtitle_bodies (key, body) VALUES (?, ?)",
+            (subtitle_key(url), json.dumps(body, ensure_ascii=False)),
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,194 @@
+# /// script
+# dependencies = [
+#   "requests",
+#   "httpx[http2]",
+# ]
+# ///
+
+"""
+常驻字幕服务：供 tampermonkey/bilibili_AI_Video_Summarizer.user.js 调用。
+
+所有请求共用一个 BilibiliClient（HTTP/2 连接池），视频信息与字幕先查本地 SQLite 缓存（BilibiliCache），
+拼好的字幕文本另有一层内存 LRU 缓存；同一视频的并发请求合并为一次获取。
+
+接口:
+    GET /get_video_text_content?video_url=<链接>
+        → 200 text/plain："以下是该B站视频的字幕内容：\\n\\n..."（与命令行脚本的输出相同）
+        → 404 text/plain：无法解析 bvid、分P 不存在或未找到字幕
+        → 502 text/plain：请求B站失败（网络、TLS、超时或接口返回异常），可稍后重试；失败结果不缓存
+    GET /health  → {"status": "ok"}
+    GET /metrics → {"requests": ..., "memory_hits": ..., "coalesced": ..., "errors": ..., "upstream_errors": ..., "upstream_requests": ..., ...}
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+import httpx
+from urllib.parse import parse_qs, urlsplit
+
+from bilibili_async import API_BASE, DEFAULT_CONCURRENCY, BilibiliClient
+from bilibili_cache import BilibiliCache
+from fetch_bilibili_subtitle_content import parse_video_url
+from subtitle_formats import TEXT_PREFIX
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_MEMORY_ENTRIES = 256  # 内存中保留的字幕文本条数
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+class UpstreamError(Exception):
+    """请求B站失败（网络、TLS、超时或响应无法解析），与"视频没有字幕"（LookupError）区分，客户端可重试。"""
+
+
+class SubtitleService:
+    """把视频链接转换为字幕文本，负责内存缓存、请求合并与统计。"""
+
+    def __init__(self, client: BilibiliClient, memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.client = client
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()   # (bvid, page) → 字幕文本
+        self._inflight = {}            # (bvid, page) → 正在进行的获取任务
+        self.started_at = time.time()
+        self.stats = {"requests": 0, "memory_hits": 0, "coalesced": 0, "errors": 0, "upstream_errors": 0, "fetches": 0, "fetch_seconds": 0.0}
+
+    async def video_text(self, video_url: str) -> str:
+        """
+        返回视频（链接所指分P）的字幕文本，以 TEXT_PREFIX 开头。
+        没有 bvid、分P 或字幕时抛出 LookupError；请求B站失败时抛出 UpstreamError。
+        """
+        self.stats["requests"] += 1
+        try:
+            url = await self.client.resolve_video_url(video_url)
+        except httpx.HTTPError as e:
+            raise UpstreamError(f'展开短链接失败: {e}') from e
+        bvid, page = parse_video_url(url)
+        if not bvid:
+            raise LookupError('无法获取 bvid')
+        key = (bvid, page)
+
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self._memory[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # shield：某个客户端断开时不取消其他请求共用的任务。
+        # 失败时异常直接抛出、不写入内存缓存，任务结束即移出 _inflight，下一次请求会重新获取
+        text = await asyncio.shield(task)
+
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+        return text
+
+    async def _fetch(self, url: str) -> str:
+        start = time.monotonic()
+        try:
+            part = (await self.client.fetch_video_text(url))[0]
+        except (httpx.HTTPError, ValueError) as e:
+            # 视频信息请求的网络错误或非 JSON 响应
+            raise UpstreamError(str(e) or type(e).__name__) from e
+        finally:
+            self.stats["fetches"] += 1
+            self.stats["fetch_seconds"] += time.monotonic() - start
+        if 'error' in part:
+            raise (UpstreamError if part.get('retryable') else LookupError)(part['error'])
+        return TEXT_PREFIX + ", ".join(item.get('content', '') for item in part['body'])
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "fetch_seconds": round(self.stats["fetch_seconds"], 3),
+            "memory_entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "upstream_requests": self.client.request_count,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个 HTTP/1.1 GET 请求（响应后关闭连接）。"""
+        content_type = "application/json; charset=utf-8"
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()).strip():
+                pass
+
+            if len(request_line) < 2 or request_line[0] != "GET":
+                status, payload = 400, {"error": "bad request"}
+            else:
+                target = urlsplit(request_line[1])
+                query = {k: v[0] for k, v in parse_qs(target.query).items()}
+                if target.path == "/health":
+                    status, payload = 200, {"status": "ok"}
+                elif target.path == "/metrics":
+                    status, payload = 200, self.metrics()
+                elif target.path == "/get_video_text_content":
+                    content_type = "text/plain; charset=utf-8"
+                    if not query.get("video_url"):
+                        status, payload = 400, "缺少 video_url 参数"
+                    else:
+                        try:
+                            status, payload = 200, await self.video_text(query["video_url"])
+                        except LookupError as e:
+                            self.stats["errors"] += 1
+                            status, payload = 404, str(e)
+                        except UpstreamError as e:
+                            self.stats["errors"] += 1
+                            self.stats["upstream_errors"] += 1
+                            status, payload = 502, f'请求B站失败，请稍后重试: {e}'
+                else:
+                    status, payload = 404, {"error": "not found"}
+        except Exception as e:
+            self.stats["errors"] += 1
+            status, payload = 500, {"error": str(e)}
+            content_type = "application/json; charset=utf-8"
+
+        data = (payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='常驻B站字幕服务（供油猴脚本调用）')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'监听地址（默认 {DEFAULT_HOST}；局域网访问请用 0.0.0.0）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口（默认 {DEFAULT_PORT}）')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help=f'同时进行的B站请求数（默认 {DEFAULT_CONCURRENCY}）')
+    parser.add_argument('--memory-entries', type=int, default=DEFAULT_MEMORY_ENTRIES, help=f'内存中缓存的字幕文本条数（默认 {DEFAULT_MEMORY_ENTRIES}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用本地磁盘缓存')
+    parser.add_argument('--api-base', default=API_BASE, help='B站 API 地址（测试时可指向本地模拟接口）')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else BilibiliCache()
+    async with BilibiliClient(api_base=args.api_base, concurrency=args.concurrency, cache=cache) as client:
+        service = SubtitleService(client, args.memory_entries)
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        print(f"bilibili_server listening on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
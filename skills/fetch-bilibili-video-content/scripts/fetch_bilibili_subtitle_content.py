@@ -5,18 +5,145 @@
 # ///
 
 import re
+import sys
+import json
+import time
+import threading
 import requests
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 
+from bilibili_cache import BilibiliCache
 from config import BILIBILI_HEADERS
+from subtitle_formats import DEFAULT_CHUNK_SECONDS, FORMATS, write_subtitles
 
 if not BILIBILI_HEADERS:
     print('请配置 BILIBILI_HEADERS，获取方法：通过网站 https://curlconverter.com/python/，自行把B站的curl命令转为python代码，将 headers 替换掉的 BILIBILI_HEADERS，注意把 cookie 键解除注释！')
     exit(1)
 
+DEFAULT_WORKERS = 4        # 批量模式下同时处理的视频数
+DEFAULT_RATE_LIMIT = 0.3   # 批量模式下相邻两次 API 请求的最小间隔（秒）
+PREFERRED_LANGS = ("中文", "English")
+
+VIEW_API = 'https://api.bilibili.com/x/web-interface/view'
+PLAYER_API = 'https://api.bilibili.com/x/player/wbi/v2'
+FAV_API = 'https://api.bilibili.com/x/v3/fav/resource/list'
+SEASON_API = 'https://api.bilibili.com/x/polymer/web-space/seasons_archives_list'
+SERIES_API = 'https://api.bilibili.com/x/series/archives'
+
+
+class RateLimiter:
+    """全局限速：相邻两次请求至少间隔 interval 秒（线程安全）；interval 为 0 时不限速。"""
+
+    def __init__(self, interval: float = 0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last = float('-inf')
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            delay = self._last + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._last = time.monotonic()
+
 
 session = requests.Session()
 session.headers.update(BILIBILI_HEADERS)
+rate_limiter = RateLimiter()
+# 本地缓存（BilibiliCache）；为 None 时每次都请求网络。命令行默认启用，--no-cache 关闭
+cache: BilibiliCache | None = None
+
+
+def _get(url: str, **kwargs):
+    rate_limiter.wait()
+    return session.get(url, **kwargs)
+
+
+def _api(url: str, params: dict) -> dict | None:
+    """请求 B 站 JSON 接口，成功（code == 0）时返回 data，否则打印错误并返回 None。"""
+    resp = _get(url, params=params, cookies=session.cookies)
+    payload = resp.json()
+    if payload.get('code') != 0 or not payload.get('data'):
+        print('B站接口请求失败:', url, payload.get('message'), file=sys.stderr)
+        return None
+    return payload['data']
+
+
+def resolve_video_url(video_url: str) -> str:
+    """展开 b23.tv 短链接，其余链接原样返回。"""
+    if not video_url.startswith(('https://b23.tv/', 'http://b23.tv/')):
+        return video_url
+    target = cache.get_short_link(video_url) if cache else None
+    if target is None:
+        target = _get(video_url).url
+        if cache:
+            cache.put_short_link(video_url, target)
+    return target
+
+
+def parse_video_url(video_url: str) -> tuple[str | None, int]:
+    """从视频链接中解析 (bvid, 分P序号)，没有 p 参数时为第 1P。"""
+    bvid_match = re.search(r'(BV[\w]+)', video_url)
+    page_match = re.search(r'[?&]p=(\d+)', video_url)
+    return (bvid_match.group(1) if bvid_match else None), (int(page_match.group(1)) if page_match else 1)
+
+
+def fetch_video_view(bvid: str) -> dict | None:
+    """获取视频信息（aid、cid、标题与各分P），失败返回 None。"""
+    view = cache.get_view(bvid) if cache else None
+    if view is None:
+        view = _api(VIEW_API, {'bvid': bvid})
+        if cache and view is not None:
+            cache.put_view(bvid, view)
+    return view
+
+
+def page_cid(view: dict, page: int) -> int:
+    """取第 page 个分P 的 cid；分P 不存在时回退为视频默认 cid。"""
+    pages = view.get('pages', [])
+    if len(pages) >= page:
+        return pages[page - 1]['cid']
+    return view.get('cid')
+
+
+def fetch_subtitle_list(aid: int, cid: int) -> list[dict]:
+    """获取某个分P 的字幕列表（不含字幕正文），失败或无字幕时返回空列表（空列表不缓存）。"""
+    cached = cache.get_subtitle_list(aid, cid) if cache else None
+    if cached is not None:
+        return cached
+
+    player_resp = _get(PLAYER_API, params={'aid': aid, 'cid': cid}, cookies=session.cookies)
+    player_data = player_resp.json()
+
+    subtitles = (
+        player_data
+        .get('data', {})
+        .get('subtitle', {})
+        .get('subtitles')
+    )
+
+    if not subtitles:
+        print('获取字幕列表失败', file=sys.stderr)
+        return []
+
+    result = []
+    for idx, sub in enumerate(subtitles):
+        lan = sub.get('lan', '')
+        result.append({
+            'id': sub.get('id', idx),
+            'lan': lan,
+            'lan_doc': sub.get('lan_doc'),
+            'subtitle_url': sub.get('subtitle_url'),
+            'isAI': lan.startswith('ai-'),
+            'isCC': not lan.startswith('ai-'),
+        })
+    if cache:
+        cache.put_subtitle_list(aid, cid, result)
+    return result
 
 
 def fetch_bilibili_subtitles(video_url: str):
@@ -24,120 +151,258 @@ def fetch_bilibili_subtitles(video_url: str):
     获取字幕列表（不含字幕正文）
     """
 
-    if video_url.startswith('https://b23.tv/'):
-        video_url = requests.get(video_url).url
-        
-    bvid_match = re.search(r'(BV[\w]+)', video_url)
-    page_match = re.search(r'[?&]p=(\d+)', video_url)
-
-    bvid = bvid_match.group(1) if bvid_match else None
-    page = int(page_match.group(1)) if page_match else 1
+    video_url = resolve_video_url(video_url)
+    bvid, page = parse_video_url(video_url)
 
     if not bvid:
-        print('无法获取 bvid')
+        print('无法获取 bvid', file=sys.stderr)
         return []
 
     try:
         # 获取 aid / cid
-        view_resp = session.get(
-            'https://api.bilibili.com/x/web-interface/view',
-            params={'bvid': bvid},
-            cookies=session.cookies
-        )
-        view_data = view_resp.json()
-
-        if view_data.get('code') != 0 or not view_data.get('data'):
-            print('获取视频信息失败:', view_data.get('message'))
+        view = fetch_video_view(bvid)
+        if view is None:
             return []
 
-        data = view_data['data']
-        aid = data['aid']
-        pages = data.get('pages', [])
-        cid = data.get('cid')
-
-        if len(pages) >= page:
-            cid = pages[page - 1]['cid']
-
-        # print(f'B站视频: aid={aid}, cid={cid}')
+        # print(f'B站视频: aid={view["aid"]}, cid={page_cid(view, page)}')
 
         # 获取字幕列表
-        player_resp = session.get(
-            'https://api.bilibili.com/x/player/wbi/v2',
-            params={'aid': aid, 'cid': cid},
-            cookies=session.cookies
-        )
-        player_data = player_resp.json()
-
-        subtitles = (
-            player_data
-            .get('data', {})
-            .get('subtitle', {})
-            .get('subtitles')
-        )
-
-        if not subtitles:
-            print('获取字幕列表失败')
-            return []
-
-        result = []
-        for idx, sub in enumerate(subtitles):
-            lan = sub.get('lan', '')
-            result.append({
-                'id': sub.get('id', idx),
-                'lan': lan,
-                'lan_doc': sub.get('lan_doc'),
-                'subtitle_url': sub.get('subtitle_url'),
-                'isAI': lan.startswith('ai-'),
-                'isCC': not lan.startswith('ai-'),
-            })
-
-        return result
+        return fetch_subtitle_list(view['aid'], page_cid(view, page))
 
     except Exception as e:
-        print('B站字幕获取出错:', e)
+        print('B站字幕获取出错:', e, file=sys.stderr)
         return []
 
 
+def fetch_subtitle_body(url: str) -> list[dict]:
+    """获取单条字幕的 body（[{"from", "to", "content"}, ...]），失败时抛出异常。"""
+    body = cache.get_subtitle_body(url) if cache else None
+    if body is None:
+        body = _get('https:' + url if url.startswith('//') else url).json()['body']
+        if cache:
+            cache.put_subtitle_body(url, body)
+    return body
+
+
 def fetch_bilibili_subtitle_content(url: str):
     """
     获取单条字幕正文
     """
     try:
-        if url.startswith('//'):
-            url = 'https:' + url
-
-        resp = session.get(url)
-        data = resp.json()
-        content_obj_list = data.get('body')
+        content_obj_list = fetch_subtitle_body(url)
         return ", ".join([content_obj.get('content', '') for content_obj in content_obj_list])
 
     except Exception as e:
-        print('B站字幕内容获取失败:', e)
-        return []
+        print('B站字幕内容获取失败:', e, file=sys.stderr)
+        return ""
+
+
+def choose_subtitle(subs: list[dict]) -> dict | None:
+    """按列表顺序选第一条中文或英文字幕。"""
+    for sub in subs:
+        if sub['lan_doc'] in PREFERRED_LANGS:
+            return sub
+    return None
+
+
+# --- 批量模式 ---
+
+def _paged(url: str, params: dict, items_key: str, page_key: str, has_more) -> list[dict]:
+    """逐页拉取列表接口直到 has_more(data, 已取条数) 为假。"""
+    items = []
+    page = 1
+    while True:
+        data = _api(url, {**params, page_key: page})
+        if data is None:
+            break
+        items.extend(data.get(items_key) or [])
+        if not has_more(data, len(items)) or not data.get(items_key):
+            break
+        page += 1
+    return items
+
+
+def fetch_favorite_bvids(media_id: str) -> list[str]:
+    """收藏夹中全部视频的 bvid（跳过已失效的视频）。"""
+    medias = _paged(
+        FAV_API, {'media_id': media_id, 'ps': 20, 'platform': 'web'}, 'medias', 'pn',
+        lambda data, _: data.get('has_more'),
+    )
+    return [m['bvid'] for m in medias if m.get('bvid') and m.get('attr', 0) == 0]
+
+
+def fetch_season_bvids(mid: str, season_id: str) -> list[str]:
+    """合集（season）中全部视频的 bvid。"""
+    archives = _paged(
+        SEASON_API, {'mid': mid, 'season_id': season_id, 'page_size': 30}, 'archives', 'page_num',
+        lambda data, n: n < data.get('page', {}).get('total', 0),
+    )
+    return [a['bvid'] for a in archives if a.get('bvid')]
+
+
+def fetch_series_bvids(mid: str, series_id: str) -> list[str]:
+    """视频列表（series）中全部视频的 bvid。"""
+    archives = _paged(
+        SERIES_API, {'mid': mid, 'series_id': series_id, 'ps': 30}, 'archives', 'pn',
+        lambda data, n: n < data.get('page', {}).get('total', 0),
+    )
+    return [a['bvid'] for a in archives if a.get('bvid')]
+
+
+def expand_url(url: str, all_pages: bool = False) -> list[dict]:
+    """
+    把一个输入链接展开为若干待处理的分P：
+        - 收藏夹：.../favlist?fid=<id>、.../list/ml<id>
+        - 合集/视频列表：.../collectiondetail?sid=<id>、.../seriesdetail?sid=<id>、
+          .../lists/<id>?type=season|series（需含 space.bilibili.com/<mid>）
+        - 普通视频：链接中的分P；all_pages 为 True 时展开全部分P
+    返回 [{"url", "bvid", "page", "aid", "cid", "title", "part"}, ...]，视频信息获取失败时抛出 ValueError。
+    """
+    url = resolve_video_url(url.strip())
+    mid_match = re.search(r'space\.bilibili\.com/(\d+)', url)
+    fav_match = re.search(r'[?&]fid=(\d+)', url) or re.search(r'/list/ml(\d+)', url)
+    season_match = re.search(r'collectiondetail\?sid=(\d+)', url) or re.search(r'/lists/(\d+)\?type=season', url)
+    series_match = re.search(r'seriesdetail\?sid=(\d+)', url) or re.search(r'/lists/(\d+)\?type=series', url)
+
+    if fav_match:
+        bvids = fetch_favorite_bvids(fav_match.group(1))
+    elif mid_match and season_match:
+        bvids = fetch_season_bvids(mid_match.group(1), season_match.group(1))
+    elif mid_match and series_match:
+        bvids = fetch_series_bvids(mid_match.group(1), series_match.group(1))
+    else:
+        bvid, page = parse_video_url(url)
+        if not bvid:
+            raise ValueError('无法获取 bvid')
+        return _video_targets(url, bvid, None if all_pages else page)
+
+    targets = []
+    for bvid in bvids:
+        targets.extend(_video_targets(f'https://www.bilibili.com/video/{bvid}', bvid, None if all_pages else 1))
+    return targets
+
+
+def _video_targets(url: str, bvid: str, page: int | None) -> list[dict]:
+    """单个视频的待处理分P；page 为 None 时返回全部分P。"""
+    view = fetch_video_view(bvid)
+    if view is None:
+        raise ValueError(f'获取视频信息失败: {bvid}')
+    pages = view.get('pages') or [{'page': 1, 'cid': view.get('cid'), 'part': ''}]
+    if page is not None:
+        pages = [p for p in pages if p.get('page') == page] or [{'page': page, 'cid': page_cid(view, page), 'part': ''}]
+    return [
+        {'url': url, 'bvid': bvid, 'page': p['page'], 'aid': view['aid'], 'cid': p['cid'],
+         'title': view.get('title'), 'part': p.get('part')}
+        for p in pages
+    ]
+
+
+def fetch_target(target: dict, list_only: bool = False) -> dict:
+    """处理一个分P：获取字幕列表并下载首选字幕正文，返回一条 NDJSON 记录。"""
+    record = {k: target[k] for k in ('url', 'bvid', 'page', 'title', 'part')}
+    subs = fetch_subtitle_list(target['aid'], target['cid'])
+    if list_only:
+        return {**record, 'subtitles': subs}
+    sub = choose_subtitle(subs)
+    if sub is None:
+        return {**record, 'error': '未找到中英文字幕' if subs else '未找到字幕'}
+    body = fetch_subtitle_body(sub['subtitle_url'])
+    return {**record, 'lan_doc': sub['lan_doc'], 'content': ", ".join(item.get('content', '') for item in body)}
+
+
+def run_batch(urls: list[str], workers: int = DEFAULT_WORKERS, all_pages: bool = False, list_only: bool = False, out=sys.stdout):
+    """
+    批量处理多个链接：链接展开（收藏夹/合集/多P）与各分P 的字幕获取都在同一个线程池中并发进行，
+    所有请求共用一个 keep-alive 会话并经过 rate_limiter 限速；每完成一个分P 即输出一行 JSON。
+    """
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 10))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {pool.submit(expand_url, url, all_pages): url for url in urls}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    record = source if isinstance(source, dict) else {'url': source}
+                    out.write(json.dumps({**record, 'error': str(e)}, ensure_ascii=False) + '\n')
+                    out.flush()
+                    continue
+                if isinstance(source, dict):
+                    out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    out.flush()
+                else:
+                    # 链接展开完成：每个分P 作为独立任务提交
+                    for target in result:
+                        running[pool.submit(fetch_target, target, list_only)] = {
+                            k: target[k] for k in ('url', 'bvid', 'page', 'title', 'part')
+                        }
+
+
+def read_urls(path: str) -> list[str]:
+    """读取链接列表：每行一个，忽略空行和 # 开头的行；path 为 "-" 时读标准输入。"""
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
 
 
 def parse_arguments():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='获取B站视频字幕')
-    
+
     # 添加视频URL参数
-    parser.add_argument('VIDEO_URL', type=str, help='B站视频链接')
-    
+    parser.add_argument('VIDEO_URL', type=str, nargs='*', help='B站视频链接（批量模式下可给出多个，也可以是收藏夹或合集链接）')
+
     # 添加可选参数：是否只获取字幕列表（不下载内容）
     parser.add_argument('--list-only', action='store_true', help='仅显示字幕信息列表，不获取内容')
-    
+
+    # 批量模式
+    parser.add_argument('--batch', metavar='FILE', help='批量模式：从文件读取链接（每行一个，- 表示标准输入），每个分P 输出一行 JSON')
+    parser.add_argument('--all-pages', action='store_true', help='批量模式：处理多P视频的全部分P')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'批量模式：同时处理的分P 数（默认 {DEFAULT_WORKERS}）')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT, help=f'批量模式：相邻两次请求的最小间隔秒数（默认 {DEFAULT_RATE_LIMIT}）')
+
+    # 输出格式（单个视频）
+    parser.add_argument('--format', choices=FORMATS, default='text',
+                        help='输出格式：text 纯文本（默认）、srt、vtt、ndjson（每条字幕一行，含时间）、chunks（按时间窗口合并）')
+    parser.add_argument('--chunk-seconds', type=float, default=DEFAULT_CHUNK_SECONDS, help=f'chunks 格式的时间窗口长度（秒，默认 {DEFAULT_CHUNK_SECONDS}）')
+    parser.add_argument('-o', '--output', metavar='FILE', help='把字幕写入文件而不是标准输出')
+
+    # 本地缓存
+    parser.add_argument('--no-cache', action='store_true', help='不使用本地缓存（视频信息、字幕列表与字幕正文）')
+
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     # 获取命令行参数
     args = parse_arguments()
-    video_url = args.VIDEO_URL
+    if not args.no_cache:
+        cache = BilibiliCache()
+
+    # 批量模式：--batch、多个链接或 --all-pages
+    if args.batch or len(args.VIDEO_URL) > 1 or args.all_pages:
+        urls = args.VIDEO_URL + (read_urls(args.batch) if args.batch else [])
+        rate_limiter.interval = args.rate_limit
+        run_batch(urls, args.workers, args.all_pages, args.list_only)
+        exit(0)
+
+    if not args.VIDEO_URL:
+        print("请提供 VIDEO_URL 或 --batch FILE")
+        exit(2)
+    video_url = args.VIDEO_URL[0]
     # 检查是否只列出字幕
     if args.list_only:
         print(f"正在获取视频: {video_url} 的字幕列表...")
         subs = fetch_bilibili_subtitles(video_url)
-        
+
         if subs:
             print(f"\n找到 {len(subs)} 个字幕:")
             for idx, sub in enumerate(subs):
@@ -147,22 +412,26 @@ if __name__ == "__main__":
             print("未找到字幕。您的 cookie 是否过期？")
         exit(0)
 
-    content = f"以下是该B站视频的字幕内容：\n\n"
     subs = fetch_bilibili_subtitles(video_url)
     if not subs:
         print("未找到字幕，程序退出。您的 cookie 是否过期？")
         exit(1)
 
     # 寻找中英文字幕
-    found = False
-    for sub in subs:
-        if sub['lan_doc'] == "中文" or sub['lan_doc'] == "English":
-            content += fetch_bilibili_subtitle_content(sub['subtitle_url'])
-            found = True
-            break
-    
-    if not found:
+    sub = choose_subtitle(subs)
+    if sub is None:
         print("未找到中英文字幕，但找到了其他字幕，请使用 --list-only 参数查看。")
         exit(1)
 
-    print(content)
\ No newline at end of file
+    try:
+        body = fetch_subtitle_body(sub['subtitle_url'])
+    except Exception as e:
+        print('B站字幕内容获取失败:', e, file=sys.stderr)
+        exit(1)
+
+    # 逐段写出，不把整段字幕拼成一个字符串
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            write_subtitles(body, args.format, f, args.chunk_seconds)
+    else:
+        write_subtitles(body, args.format, sys.stdout, args.chunk_seconds)
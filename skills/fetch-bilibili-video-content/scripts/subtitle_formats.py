@@ -0,0 +1,96 @@
+"""
+字幕正文（[{"from", "to", "content"}, ...]）的输出格式。
+
+每种格式都是生成器，逐条产出文本片段，由 write_subtitles 依次写入 stdout 或文件，
+长视频的字幕不需要先拼成一个完整的字符串：
+    - text:   与原脚本相同的纯文本（以 ", " 连接，不含时间）
+    - srt:    SubRip 字幕
+    - vtt:    WebVTT 字幕
+    - ndjson: 每条字幕一行 JSON：{"index", "from", "to", "content"}
+    - chunks: 按 N 秒时间窗口合并，每个窗口一行 JSON：{"index", "from", "to", "content"}，
+              便于下游并行总结或按时间定位
+
+示例:
+    from subtitle_formats import write_subtitles
+    write_subtitles(fetch_subtitle_body(sub['subtitle_url']), 'chunks', sys.stdout, chunk_seconds=120)
+"""
+
+import json
+from typing import Iterable, Iterator, TextIO
+
+FORMATS = ("text", "srt", "vtt", "ndjson", "chunks")
+DEFAULT_CHUNK_SECONDS = 60
+TEXT_PREFIX = "以下是该B站视频的字幕内容：\n\n"
+
+
+def timestamp(seconds: float, separator: str = ",") -> str:
+    """秒数 → HH:MM:SS,mmm（SRT）；separator 为 "." 时为 WebVTT 格式。"""
+    ms = round(seconds * 1000)
+    hours, ms = divmod(ms, 3600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{ms:03d}"
+
+
+def format_text(body: Iterable[dict]) -> Iterator[str]:
+    yield TEXT_PREFIX
+    for i, item in enumerate(body):
+        yield (", " if i else "") + item.get('content', '')
+    yield "\n"
+
+
+def format_srt(body: Iterable[dict]) -> Iterator[str]:
+    for i, item in enumerate(body, 1):
+        yield f"{i}\n{timestamp(item['from'])} --> {timestamp(item['to'])}\n{item.get('content', '')}\n\n"
+
+
+def format_vtt(body: Iterable[dict]) -> Iterator[str]:
+    yield "WEBVTT\n\n"
+    for item in body:
+        yield f"{timestamp(item['from'], '.')} --> {timestamp(item['to'], '.')}\n{item.get('content', '')}\n\n"
+
+
+def format_ndjson(body: Iterable[dict]) -> Iterator[str]:
+    for i, item in enumerate(body):
+        segment = {'index': i, 'from': item['from'], 'to': item['to'], 'content': item.get('content', '')}
+        yield json.dumps(segment, ensure_ascii=False) + "\n"
+
+
+def iter_chunks(body: Iterable[dict], seconds: float = DEFAULT_CHUNK_SECONDS) -> Iterator[dict]:
+    """按字幕开始时间所在的 seconds 秒窗口分组，产出 {"index", "from", "to", "content"}（index 为窗口序号）。"""
+    window = None
+    items = []
+    for item in body:
+        index = int(item['from'] // seconds)
+        if items and index != window:
+            yield _chunk(window, items)
+            items = []
+        window = index
+        items.append(item)
+    if items:
+        yield _chunk(window, items)
+
+
+def _chunk(window: int, items: list[dict]) -> dict:
+    return {
+        'index': window,
+        'from': items[0]['from'],
+        'to': items[-1]['to'],
+        'content': ", ".join(item.get('content', '') for item in items),
+    }
+
+
+def format_chunks(body: Iterable[dict], seconds: float = DEFAULT_CHUNK_SECONDS) -> Iterator[str]:
+    for chunk in iter_chunks(body, seconds):
+        yield json.dumps(chunk, ensure_ascii=False) + "\n"
+
+
+def write_subtitles(body: Iterable[dict], fmt: str, out: TextIO, chunk_seconds: float = DEFAULT_CHUNK_SECONDS):
+    """把字幕正文按 fmt 格式逐段写入 out。"""
+    if fmt == "chunks":
+        pieces = format_chunks(body, chunk_seconds)
+    else:
+        pieces = {"text": format_text, "srt": format_srt, "vtt": format_vtt, "ndjson": format_ndjson}[fmt](body)
+    for piece in pieces:
+        out.write(piece)
+    out.flush()
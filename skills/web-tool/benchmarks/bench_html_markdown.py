@@ -0,0 +1,124 @@
+"""
+HTML → Markdown 转换基准：对比旧的多遍正则实现与 html_markdown 的单遍转换器。
+
+用法:
+    python benchmarks/bench_html_markdown.py saved_pages/          # 目录下所有 *.html / *.htm
+    python benchmarks/bench_html_markdown.py page1.html page2.html
+    python benchmarks/bench_html_markdown.py --synthetic 0.5        # 生成合成页面（无语料时默认 0.5 MB）
+
+保存语料可用浏览器“另存为网页（仅 HTML）”，或 curl -o page.html URL。
+"""
+
+import argparse
+import glob
+import html
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from html_markdown import html_to_markdown
+
+
+# --- 旧实现（web_fetch.py 中被替换前的版本），仅用于对比 ---
+
+def _strip_tags(text: str) -> str:
+    """Remove HTML tags and decode entities."""
+    text = re.sub(r'<script[\s\S]*?</script>', '', text, flags=re.I)
+    text = re.sub(r'<style[\s\S]*?</style>', '', text, flags=re.I)
+    text = re.sub(r'<[^>]+>', '', text)
+    return html.unescape(text).strip()
+
+
+def _normalize(text: str) -> str:
+    """Normalize whitespace."""
+    text = re.sub(r'[ \t]+', ' ', text)
+    return re.sub(r'[ \n]{3,}', '\n\n', text).strip()
+
+
+def regex_to_markdown(html_content: str) -> str:
+    """Convert HTML to markdown."""
+    text = re.sub(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>([\s\S]*?)</a>',
+                lambda m: f'[{_strip_tags(m[2])}]({m[1]})', html_content, flags=re.I)
+    text = re.sub(r'<h([1-6])[^>]*>([\s\S]*?)</h\1>',
+                lambda m: f'\n{"#" * int(m[1])} {_strip_tags(m[2])}\n', text, flags=re.I)
+    text = re.sub(r'<li[^>]*>([\s\S]*?)</li>', lambda m: f'\n- {_strip_tags(m[1])}', text, flags=re.I)
+    text = re.sub(r'</(p|div|section|article)>', '\n\n', text, flags=re.I)
+    text = re.sub(r'<(br|hr)\s*/?>', '\n', text, flags=re.I)
+    return _normalize(_strip_tags(text))
+
+
+def synthetic_page(megabytes: float, optional_end_tags: bool = False) -> str:
+    """
+    生成包含导航、标题、段落、列表、表格和代码块的合成页面。
+    optional_end_tags 为 True 时省略 </li>、</p>、</td> 等可选结束标签（合法 HTML，真实页面中很常见）。
+    """
+    section = (
+        '<nav><ul><li><a href="/a">Home</a></li><li><a href="/b">Docs</a></li></ul></nav>'
+        '<h2>Section <a href="#s">title</a></h2>'
+        '<p>Lorem ipsum <b>dolor</b> sit amet, <a href="https://example.com/x?y=1">consectetur</a> '
+        'adipiscing elit &amp; sed do eiusmod tempor.<br>Second line.</p>'
+        '<ul><li>alpha</li><li>beta <code>x = 1</code></li></ul>'
+        '<table><tr><th>k</th><th>v</th></tr><tr><td>1</td><td>2</td></tr></table>'
+        '<pre><code>for i in range(3):\n    print(i)</code></pre>'
+        '<script>var x = "<div>not content</div>";</script>'
+    )
+    if optional_end_tags:
+        for tag in ("</li>", "</p>", "</td>", "</th>", "</tr>"):
+            section = section.replace(tag, "")
+    count = max(1, int(megabytes * 1024 * 1024 / len(section)))
+    return f"<html><head><title>synthetic</title></head><body>{section * count}</body></html>"
+
+
+def load_corpus(paths: list[str]) -> list[tuple[str, str]]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.htm*")))
+        else:
+            files.append(path)
+    corpus = []
+    for file in files:
+        with open(file, encoding="utf-8", errors="replace") as f:
+            corpus.append((os.path.basename(file), f.read()))
+    return corpus
+
+
+def timed(func, text: str, repeat: int) -> tuple[float, str]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the single-pass HTML-to-Markdown converter against the old regex pipeline.")
+    parser.add_argument("paths", nargs="*", help="Saved HTML files or directories containing them")
+    parser.add_argument("--synthetic", type=float, default=None, help="Also benchmark a generated page of this many MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page; the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.paths)
+    if args.synthetic or not corpus:
+        size = args.synthetic or 0.5
+        corpus.append((f"synthetic-{size}MB", synthetic_page(size)))
+        corpus.append((f"synthetic-{size}MB-optional-end-tags", synthetic_page(size, optional_end_tags=True)))
+
+    print(f"{'page':<40} {'KB':>8} {'regex s':>9} {'single-pass s':>14} {'speedup':>8} {'md chars (regex/new)':>22}")
+    total_old = total_new = 0.0
+    for name, text in corpus:
+        old_time, old_md = timed(regex_to_markdown, text, args.repeat)
+        new_time, new_md = timed(html_to_markdown, text, args.repeat)
+        total_old += old_time
+        total_new += new_time
+        print(f"{name[:40]:<40} {len(text) / 1024:>8.0f} {old_time:>9.3f} {new_time:>14.3f} "
+              f"{old_time / new_time:>7.1f}x {f'{len(old_md)}/{len(new_md)}':>22}")
+    print(f"{'TOTAL':<40} {'':>8} {total_old:>9.3f} {total_new:>14.3f} {total_old / total_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+单遍、事件驱动的 HTML → Markdown 转换器。
+
+以 lxml（libxml2）HTML 解析器的 target 接口接收开始标签/结束标签/文本事件，
+一次遍历完成转换：支持链接、标题、（嵌套）列表、表格、代码块/行内代码、引用、
+换行与分隔线，并跳过 script/style 等不可见内容。libxml2 会自动补全未闭合的标签，
+耗时与文档大小成线性关系，不存在正则逐条替换时的回溯与多次全文扫描。
+
+示例:
+    from html_markdown import html_to_markdown
+    markdown = html_to_markdown(page_html, base_url="https://example.com/article")
+"""
+
+import re
+from urllib.parse import urljoin
+
+from lxml import etree
+
+# 内容不可见、整段丢弃的元素
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "title"}
+# 块级元素：前后各留一个空行
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "footer", "aside", "nav",
+    "figure", "figcaption", "form", "fieldset", "details", "summary", "address", "dl", "dt", "dd",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+LIST_TAGS = {"ul", "ol"}
+CELL_TAGS = {"td", "th"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Buffer:
+    """一段独立收集的输出（链接文字、标题、表格单元格等），关闭时整体回写到父缓冲区。"""
+
+    __slots__ = ("kind", "attrs", "parts", "breaks", "space", "started", "at_marker")
+
+    def __init__(self, kind: str, attrs: dict | None = None):
+        self.kind = kind
+        self.attrs = attrs or {}
+        self.parts = []
+        self.breaks = 0       # 写入下一段文字前需要补的换行数
+        self.space = False    # 写入下一段文字前是否需要补一个空格
+        self.started = False  # 是否已写入过内容（开头不补换行/空格）
+        self.at_marker = False  # 打开时父缓冲区是否紧跟在列表标记之后
+
+
+class MarkdownConverter:
+    """lxml 解析器的 target：把 HTML 事件流直接写成 Markdown；一般通过 html_to_markdown() 使用。"""
+
+    def __init__(self, base_url: str | None = None):
+        self.base_url = base_url
+        self._stack = [_Buffer("root")]
+        self._buf = self._stack[0]  # 当前写入的缓冲区（栈顶）
+        self._skip = 0
+        self._pre = 0
+        self._lists = []      # 每层列表的 [类型, 序号]
+        self._tables = []     # 每层表格的 {"rows": [...], "row": [...] | None}
+        self._at_marker = False
+        self._items = 0       # 当前所在的 li 层数
+
+    # --- 输出原语 ---
+
+    def _block(self, n: int = 2):
+        """
+        请求在下一段内容前换行 n 次（紧跟列表标记时忽略，使 <li><p>..</p></li> 保持同一行）。
+        列表项内的段落只换一行，避免 <li><p>..</p></li> 渲染成项与项之间带空行的松散列表。
+        """
+        if self._items:
+            n = min(n, 1)
+        if not self._at_marker:
+            self._buf.breaks = max(self._buf.breaks, n)
+
+    def _write(self, text: str, inline_space: bool = True):
+        buf = self._buf
+        if buf.started and buf.breaks:
+            buf.parts.append("\n" * buf.breaks)
+        elif buf.started and buf.space and inline_space:
+            buf.parts.append(" ")
+        buf.parts.append(text)
+        buf.breaks = 0
+        buf.space = False
+        buf.started = True
+        self._at_marker = False
+
+    def _text(self, data: str):
+        if self._pre:
+            self._write(data, inline_space=False)
+            return
+        collapsed = _WHITESPACE.sub(" ", data)
+        stripped = collapsed.strip()
+        if not stripped:
+            if collapsed:
+                self._buf.space = True
+            return
+        if collapsed[0] == " ":
+            self._buf.space = True
+        self._write(stripped)
+        self._buf.space = collapsed[-1] == " "
+
+    def _push(self, kind: str, attrs: dict | None = None):
+        self._buf = _Buffer(kind, attrs)
+        self._buf.at_marker = self._at_marker
+        self._stack.append(self._buf)
+
+    def _pop(self) -> tuple[_Buffer, str]:
+        buf = self._stack.pop()
+        self._buf = self._stack[-1]
+        # 子缓冲区写入的内容尚未回写到父级，父级仍停在列表标记之后（<li><h3>..</h3></li> 保持同一行）
+        self._at_marker = buf.at_marker
+        return buf, "".join(buf.parts)
+
+    def _close(self, kind: str) -> bool:
+        """关闭最近一个 kind 类型的缓冲区；中间未闭合的缓冲区按纯文本并入父级。"""
+        if self._buf.kind != kind and not any(b.kind == kind for b in self._stack[1:]):
+            return False
+        while self._buf.kind != kind:
+            self._finish(*self._pop())
+        self._finish(*self._pop())
+        return True
+
+    # --- 各类缓冲区关闭时的渲染 ---
+
+    def _finish(self, buf: _Buffer, text: str):
+        kind = buf.kind
+        if kind == "a":
+            text = _WHITESPACE.sub(" ", text).strip()
+            href = buf.attrs.get("href")
+            heading = buf.attrs.get("heading")
+            if text:
+                if href and not href.startswith(("javascript:", "#")):
+                    if self.base_url:
+                        href = urljoin(self.base_url, href)
+                    text = f"[{text}]({href})"
+                if heading:
+                    # <a><h3>..</h3></a>：标题标记放在链接外，渲染为 "### [..](..)"
+                    self._block(2)
+                    self._write(f"{'#' * heading} {text}")
+                    self._block(2)
+                else:
+                    self._write(text)
+            if buf.space and not heading:
+                self._buf.space = True
+        elif kind in HEADING_TAGS:
+            text = _WHITESPACE.sub(" ", text).strip()
+            if self._buf.kind == "a":
+                # 链接内的标题只写文字，级别记在链接上，由链接关闭时统一渲染
+                if text:
+                    level = int(kind[1])
+                    self._buf.attrs["heading"] = min(self._buf.attrs.get("heading") or level, level)
+                    self._write(text)
+            elif text:
+                self._block(2)
+                self._write(f"{'#' * int(kind[1])} {text}")
+            self._block(2)
+        elif kind == "code":
+            text = _WHITESPACE.sub(" ", text).strip()
+            if text:
+                self._write(f"`{text}`")
+            if buf.space:
+                self._buf.space = True
+        elif kind == "pre":
+            code = text[1:] if text.startswith("\n") else text
+            self._block(2)
+            self._write(f"```{buf.attrs.get('lang', '')}\n{code.rstrip()}\n```", inline_space=False)
+            self._block(2)
+        elif kind == "blockquote":
+            if text.strip():
+                self._block(2)
+                self._write("\n".join(f"> {line}" if line else ">" for line in text.split("\n")))
+            self._block(2)
+        elif kind == "cell":
+            cell = _WHITESPACE.sub(" ", text).strip().replace("|", "\\|")
+            if self._tables and self._tables[-1]["row"] is not None:
+                self._tables[-1]["row"].append(cell)
+        else:
+            self._write(text)
+
+    def _end_row(self):
+        table = self._tables[-1]
+        self._close("cell")
+        if table["row"]:
+            table["rows"].append(table["row"])
+        table["row"] = None
+
+    def _end_table(self):
+        self._end_row()
+        rows = self._tables.pop()["rows"]
+        if not rows:
+            return
+        width = max(len(r) for r in rows)
+        lines = []
+        for i, row in enumerate(rows):
+            lines.append("| " + " | ".join(row + [""] * (width - len(row))) + " |")
+            if i == 0:
+                lines.append("|" + " --- |" * width)
+        self._block(2)
+        self._write("\n".join(lines))
+        self._block(2)
+
+    # --- lxml target 回调 ---
+
+    def start(self, tag, attrs):
+        if self._skip:
+            if tag in SKIP_TAGS:
+                self._skip += 1
+            return
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+
+        if self._pre:
+            if tag == "br":
+                self._write("\n", inline_space=False)
+            elif tag == "code" and not self._buf.attrs.get("lang"):
+                lang = re.search(r"(?:language|lang)-([\w+#-]+)", attrs.get("class") or "")
+                if lang:
+                    self._buf.attrs["lang"] = lang.group(1)
+            return
+
+        if tag == "a":
+            self._push("a", {"href": attrs.get("href")})
+        elif tag in HEADING_TAGS:
+            self._push(tag)
+        elif tag in BLOCK_TAGS:
+            self._block(2)
+        elif tag == "br":
+            self._block(1)
+        elif tag == "hr":
+            self._block(2)
+            self._write("---")
+            self._block(2)
+        elif tag in LIST_TAGS:
+            self._block(1 if self._lists else 2)
+            self._lists.append([tag, 0])
+        elif tag == "li":
+            self._at_marker = False
+            self._block(1)
+            self._items += 1
+            if self._lists:
+                kind = self._lists[-1]
+                kind[1] += 1
+                marker = f"{kind[1]}." if kind[0] == "ol" else "-"
+                indent = "  " * (len(self._lists) - 1)
+            else:
+                marker, indent = "-", ""
+            self._write(f"{indent}{marker} ", inline_space=False)
+            self._at_marker = True
+        elif tag == "pre":
+            self._pre += 1
+            self._push("pre")
+        elif tag == "code":
+            self._push("code")
+        elif tag == "blockquote":
+            self._push("blockquote")
+        elif tag == "table":
+            self._tables.append({"rows": [], "row": None})
+        elif tag == "tr" and self._tables:
+            self._end_row()
+            self._tables[-1]["row"] = []
+        elif tag in CELL_TAGS and self._tables:
+            table = self._tables[-1]
+            self._close("cell")
+            if table["row"] is None:
+                table["row"] = []
+            self._push("cell")
+
+    def end(self, tag):
+        if self._skip:
+            if tag in SKIP_TAGS:
+                self._skip -= 1
+            return
+
+        if self._pre and tag != "pre":
+            return
+
+        if tag == "a" or tag in HEADING_TAGS or tag in ("code", "blockquote"):
+            self._close(tag)
+        elif tag == "pre":
+            if self._close("pre"):
+                self._pre -= 1
+        elif tag in BLOCK_TAGS:
+            self._block(2)
+        elif tag in LIST_TAGS:
+            if self._lists:
+                self._lists.pop()
+            self._block(1 if self._lists else 2)
+        elif tag == "li":
+            self._at_marker = False
+            self._items = max(self._items - 1, 0)
+            self._block(1)
+        elif tag in CELL_TAGS:
+            self._close("cell")
+        elif tag == "tr" and self._tables:
+            self._end_row()
+        elif tag == "table" and self._tables:
+            self._end_table()
+
+    def data(self, data):
+        if self._skip:
+            return
+        # li 标记之后的第一段文字不需要额外空格
+        if self._at_marker:
+            data = data.lstrip()
+            if not data:
+                return
+            self._buf.space = False
+        self._text(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self) -> str:
+        """解析结束：闭合所有未闭合的元素并返回 Markdown 文本。"""
+        while self._tables:
+            self._end_table()
+        while len(self._stack) > 1:
+            self._finish(*self._pop())
+        return "".join(self._stack[0].parts).strip()
+
+
+def html_to_markdown(html_content: str, base_url: str | None = None) -> str:
+    """
+    把 HTML 转为 Markdown（单遍解析）。
+
+    参数:
+        html_content (str): 原始 HTML。
+        base_url (str | None): 页面地址，用于把相对链接补全为绝对链接。
+    """
+    if not html_content or not html_content.strip():
+        return ""
+    parser = etree.HTMLParser(target=MarkdownConverter(base_url), remove_comments=True)
+    parser.feed(html_content)
+    return parser.close()
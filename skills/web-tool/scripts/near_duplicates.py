@@ -0,0 +1,113 @@
+"""
+抓取结果的近似重复检测（MinHash）。
+
+正文按词切分（中日韩文字逐字）后取连续 SHINGLE_SIZE 个词作为 shingle，每个 shingle 哈希为
+64 位整数，保留最小的 SKETCH_SIZE 个作为指纹（bottom-k MinHash，只需对每个 shingle 哈希一次）。
+两篇正文的 Jaccard 相似度由指纹估计，达到阈值即视为同一文章的不同转载。
+
+示例:
+    from near_duplicates import dedupe_pages
+    pages = dedupe_pages(pages)  # 每组近似重复只保留一篇，其余记录在 "duplicates" 中
+"""
+
+import hashlib
+import heapq
+import re
+
+DEFAULT_THRESHOLD = 0.8  # 估计的 Jaccard 相似度不低于该值即视为近似重复
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 128
+
+_TOKEN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """小写化并切词；中日韩文字逐字切分。passages.py 的 BM25 打分也使用它。"""
+    return _TOKEN.findall(text.casefold())
+
+
+def fingerprint(text: str) -> list[int]:
+    """计算正文的 MinHash 指纹（升序排列的最小 SKETCH_SIZE 个 shingle 哈希值）。"""
+    tokens = tokenize(text)
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    hashes = {int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles}
+    return heapq.nsmallest(SKETCH_SIZE, hashes)
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """由两个指纹估计 Jaccard 相似度：取并集中最小的 SKETCH_SIZE 个哈希，统计其中两者共有的比例。"""
+    if not a or not b:
+        return 0.0
+    set_a, set_b = set(a), set(b)
+    union = heapq.nsmallest(SKETCH_SIZE, set_a | set_b)
+    return sum(1 for h in union if h in set_a and h in set_b) / len(union)
+
+
+def dedupe_pages(pages: list[dict], threshold: float = DEFAULT_THRESHOLD, score=None) -> list[dict]:
+    """
+    折叠近似重复的页面：相似度不低于 threshold 的页面（可传递地）归为一组，每组只保留得分最高的一篇。
+
+    参数:
+        pages (list[dict]): fetch_relevant_web_pages 的结果（使用 "body" 与 "href"）。
+        threshold (float): 视为近似重复的最低相似度。
+        score (callable | None): score(page) -> 可比较的值，越大越好；默认取正文长度（最完整的转载），
+            相同时保留排在前面的页面。
+    返回:
+        list[dict]: 保留的页面，顺序不变；被折叠的页面记录在保留页面的
+            "duplicates" 字段中：[{"href": ..., "similarity": ...}, ...]。
+    """
+    score = score or (lambda page: len(page.get("body") or ""))
+    prints = [fingerprint(page.get("body") or "") for page in pages]
+
+    # 并查集：相似度达到阈值的页面合并为一组
+    parent = list(range(len(pages)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(pages)):
+        for j in range(i + 1, len(pages)):
+            if root(i) != root(j) and similarity(prints[i], prints[j]) >= threshold:
+                parent[root(j)] = root(i)
+
+    clusters = {}
+    for i in range(len(pages)):
+        clusters.setdefault(root(i), []).append(i)
+
+    kept = []
+    for members in clusters.values():
+        best = max(members, key=lambda i: (score(pages[i]), -i))
+        page = pages[best]
+        if len(members) > 1:
+            page = {**page, "duplicates": [
+                {"href": pages[i]["href"], "similarity": round(similarity(prints[best], prints[i]), 3)}
+                for i in members if i != best
+            ]}
+        kept.append((best, page))
+    return [page for _, page in sorted(kept, key=lambda item: item[0])]
+
+
+class NearDuplicateFilter:
+    """
+    流式去重：逐个检查页面，与之前保留的页面近似重复时返回 (重复对象的 href, 相似度)，否则记录并返回 None。
+    先到的页面被保留，适合每个页面一完成就输出的场景。
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._kept = []
+
+    def check(self, page: dict) -> tuple[str, float] | None:
+        sketch = fingerprint(page.get("body") or "")
+        for href, other in self._kept:
+            value = similarity(sketch, other)
+            if value >= self.threshold:
+                return href, value
+        self._kept.append((page["href"], sketch))
+        return None
@@ -0,0 +1,117 @@
+"""
+网页内容的本地磁盘缓存。
+
+每个页面存为一个 JSON 文件，文件名是规范化 URL 的 SHA-256，内容包括标题、正文、
+抓取时间以及 ETag/Last-Modified（用于过期后的条件请求）。
+文件的访问时间（mtime）在每次命中时刷新，目录总大小超过上限时按 LRU 淘汰最久未用的条目。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "web-tool", "pages")
+DEFAULT_TTL = 24 * 3600                # 缓存有效期（秒）
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 缓存目录大小上限
+
+# 规范化时丢弃的跟踪参数
+_TRACKING_PARAMS = ("utm_", "spm", "fbclid", "gclid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化 URL：协议与主机名转小写，去掉默认端口、片段和常见跟踪参数，查询参数按键排序。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rpartition(":")[2]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rpartition(":")[0]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+
+class PageCache:
+    """
+    以规范化 URL 为键的页面缓存，带 TTL、LRU 淘汰和条件重新验证所需的校验字段。
+
+    示例:
+        cache = PageCache()
+        entry = cache.get(url)
+        if entry and cache.is_fresh(entry):
+            ...
+        cache.put(url, {"title": ..., "href": url, "body": ...}, etag=...)
+        cache.evict()
+    """
+
+    def __init__(self, directory: str | None = None, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get("WEB_FETCH_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url: str, variant: str) -> str:
+        key = hashlib.sha256(f"{normalize_url(url)}\n{variant}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, url: str, variant: str = "") -> dict | None:
+        """
+        读取缓存条目（不论是否过期），并刷新其 LRU 访问时间；不存在或损坏时返回 None。
+        variant 区分同一 URL 的不同提取结果（例如 readability 与 full）。
+        """
+        path = self._path(url, variant)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, url: str, result: dict, variant: str = "", etag: str | None = None, last_modified: str | None = None):
+        """写入（或覆盖）缓存条目，先写临时文件再原子替换，避免并发读到半个文件。"""
+        entry = {
+            "url": normalize_url(url),
+            "title": result.get("title"),
+            "body": result.get("body"),
+            "stats": result.get("stats"),
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(url, variant))
+
+    def revalidated(self, url: str, entry: dict, variant: str = ""):
+        """条件请求返回 304 时调用：沿用缓存内容，仅刷新抓取时间。"""
+        self.put(url, entry, variant, entry.get("etag"), entry.get("last_modified"))
+
+    def evict(self):
+        """目录总大小超过 max_bytes 时，按最近访问时间从旧到新删除条目。"""
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
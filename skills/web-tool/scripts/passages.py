@@ -0,0 +1,126 @@
+"""
+按查询相关度挑选正文段落（BM25）。
+
+把提取出的 Markdown 切成若干段落（围栏代码块不拆开，标题与其后的内容合并，过短的段落向后合并到
+约 PASSAGE_CHARS 个字符），用 BM25 对查询打分，在字符预算内保留得分最高的 top_k 段，按原文顺序拼接。
+IDF 在单个页面的段落内统计，因此每个页面可以独立处理，适合边抓取边输出。
+
+示例:
+    from passages import select_passages
+    body, info = select_passages(page["body"], "python asyncio timeout", top_k=5, max_chars=4000)
+"""
+
+import math
+from collections import Counter
+
+from near_duplicates import tokenize  # 与去重共用同一套切词
+
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_CHARS = 4000
+PASSAGE_CHARS = 500   # 段落合并的目标长度
+BM25_K1 = 1.5
+BM25_B = 0.75
+SEPARATOR = "\n\n…\n\n"  # 拼接不相邻段落时的分隔（原文中相邻的段落之间仍用空行）
+
+
+def split_passages(markdown: str, target: int = PASSAGE_CHARS) -> list[str]:
+    """按空行把 Markdown 切成块（围栏代码块内的空行不切），再把标题和短块合并成约 target 个字符的段落。"""
+    blocks = []
+    current = []
+    fenced = False
+    for line in markdown.split("\n"):
+        if line.startswith("```"):
+            fenced = not fenced
+        if not line.strip() and not fenced:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+
+    passages = []
+    pending = []
+    size = 0
+    for block in blocks:
+        pending.append(block)
+        size += len(block)
+        # 标题总是与后面的内容放在同一段
+        if size >= target and not block.startswith("#"):
+            passages.append("\n\n".join(pending))
+            pending = []
+            size = 0
+    if pending:
+        passages.append("\n\n".join(pending))
+    return passages
+
+
+def bm25_scores(passages: list[str], query: str) -> list[float]:
+    """以 passages 为语料计算每个段落对 query 的 BM25 得分。"""
+    terms = set(tokenize(query))
+    docs = [Counter(tokenize(p)) for p in passages]
+    if not terms or not docs:
+        return [0.0] * len(passages)
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1
+    n = len(docs)
+    idf = {}
+    for term in terms:
+        df = sum(1 for d in docs if term in d)
+        idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in terms:
+            tf = doc.get(term)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def select_passages(
+    markdown: str,
+    query: str,
+    top_k: int = DEFAULT_TOP_K,
+    max_chars: int = DEFAULT_MAX_CHARS,
+) -> tuple[str, dict]:
+    """
+    保留与 query 最相关的段落。
+
+    按得分从高到低依次选取，最多 top_k 段、得分为 0 的段落不选；遇到第一段放不进剩余字符预算的段落时，
+    把它截断到剩余预算后停止，不再用得分更低的短段落填满预算。选中的段落按原文顺序拼接，
+    原文中相邻的段落之间用空行，不相邻的用 SEPARATOR。若查询词完全没有出现，则按原文顺序保留开头的段落。
+
+    返回:
+        tuple[str, dict]: (拼接后的正文, {"selected": 选中段数, "total": 总段数, "scores": 选中段落的得分})
+    """
+    passages = split_passages(markdown)
+    scores = bm25_scores(passages, query)
+    if any(scores):
+        ranked = [i for i in sorted(range(len(passages)), key=lambda i: scores[i], reverse=True) if scores[i] > 0]
+    else:
+        ranked = list(range(len(passages)))
+
+    # 预算按每段之间都用 SEPARATOR 计算，实际拼接（相邻段落用空行）只会更短
+    pieces = {}
+    used = 0
+    for i in ranked[:top_k]:
+        separator = len(SEPARATOR) if pieces else 0
+        remaining = max_chars - used - separator
+        if remaining <= 0:
+            break
+        pieces[i] = passages[i][:remaining]
+        used += separator + len(pieces[i])
+        if len(passages[i]) > remaining:
+            break
+
+    chosen = sorted(pieces)
+    text = ""
+    for k, i in enumerate(chosen):
+        if k:
+            text += "\n\n" if i == chosen[k - 1] + 1 else SEPARATOR
+        text += pieces[i]
+    return text, {"selected": len(chosen), "total": len(passages), "scores": [round(scores[i], 3) for i in chosen]}
@@ -0,0 +1,97 @@
+"""
+搜索结果的本地 SQLite 缓存。
+
+键为规范化后的查询词（大小写、首尾及连续空白不敏感）加上 region/safesearch/timelimit/
+backend/page/max_results，值为 JSON 编码的结果列表。有效期按 timelimit 区分：
+限定最近一天的结果很快过时，限定一年的结果可以缓存更久。命中与未命中次数累计在同一数据库中。
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "web-tool", "search.sqlite")
+# 各 timelimit 的缓存有效期（秒）；None 表示不限时间范围
+DEFAULT_TTLS = {
+    "d": 3600,
+    "w": 6 * 3600,
+    "m": 24 * 3600,
+    "y": 7 * 24 * 3600,
+    None: 24 * 3600,
+}
+
+
+def normalize_query(query: str) -> str:
+    """查询词规范化：Unicode 大小写折叠，去掉首尾空白并把连续空白合并为一个空格。"""
+    return " ".join(query.casefold().split())
+
+
+class SearchCache:
+    """
+    以（规范化查询词, 搜索参数）为键的搜索结果缓存。
+
+    示例:
+        cache = SearchCache()
+        results = cache.get(query, params)
+        if results is None:
+            results = DDGS().text(query, **params)
+            cache.put(query, params, results)
+    """
+
+    def __init__(self, path: str | None = None, ttls: dict | None = None):
+        self.path = path or os.environ.get("WEB_SEARCH_CACHE", DEFAULT_CACHE_PATH)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, results TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @staticmethod
+    def _key(query: str, params: dict) -> str:
+        return json.dumps([normalize_query(query), sorted(params.items())], ensure_ascii=False, default=str)
+
+    def _count(self, name: str):
+        with self._db:
+            self._db.execute(
+                "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+
+    def get(self, query: str, params: dict) -> list[dict] | None:
+        """返回未过期的缓存结果，并记录一次命中或未命中；无结果时返回 None。"""
+        row = self._db.execute(
+            "SELECT results FROM results WHERE key = ? AND expires_at > ?", (self._key(query, params), time.time()),
+        ).fetchone()
+        self._count("hits" if row else "misses")
+        return json.loads(row[0]) if row else None
+
+    def put(self, query: str, params: dict, results: list[dict]):
+        """写入结果，有效期由 params["timelimit"] 决定；同时清理已过期的条目。"""
+        now = time.time()
+        ttl = self.ttls.get(params.get("timelimit"), self.ttls[None])
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, results, expires_at) VALUES (?, ?, ?)",
+                (self._key(query, params), json.dumps(results, ensure_ascii=False), now + ttl),
+            )
+            self._db.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+
+    def stats(self) -> dict:
+        """累计命中/未命中次数、命中率与当前有效条目数。"""
+        counts = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        entries = self._db.execute("SELECT COUNT(*) FROM results WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,141 @@
+# /// script
+# dependencies = [
+#   "zendriver",
+#   "readability-lxml",
+#   "httpx[http2]",
+#   "tldextract>=5.3",
+# ]
+# ///
+
+"""
+常驻抓取守护进程：保持一个预热的无头浏览器，通过本地 HTTP 接收抓取请求。
+
+web_fetch.py 与 web_search.py --detailed_content 会自动探测该进程，存在时直接把
+URL 交给它处理，省去每次调用启动/关闭 Chrome 的开销；不存在时回退到进程内模式。
+
+接口:
+    GET  /health  → {"status": "ok"}
+    POST /fetch   ← {"urls": [...], "max_wait": 15, "extract": "auto", "size_report": false, "timeout": 30}
+                  → {"results": [{"title": ..., "href": ..., "body": ..., "tier": "browser", "status": "ok", "stats": {...}}, ...]}
+                    每个 URL 一条结果；失败的 URL 的 title/body 为 null，status 为 "timeout" 或 "error"。
+"""
+
+import argparse
+import asyncio
+import json
+
+from web_fetch import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_DAEMON_ADDRESS,
+    DEFAULT_BLOCKING,
+    DEFAULT_MAX_WAIT,
+    DEFAULT_URL_TIMEOUT,
+    TabPool,
+    add_blocking_arguments,
+    blocking_from_args,
+    fetch_pages,
+    start_browser,
+)
+
+
+class FetchDaemon:
+    """持有浏览器与标签页池，并发处理来自多个客户端的抓取请求。"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, blocking: dict | None = DEFAULT_BLOCKING):
+        self.concurrency = concurrency
+        self.blocking = blocking
+        self.browser = None
+        self.pool = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_browser(self):
+        """首次使用或浏览器意外退出时（重新）启动浏览器。"""
+        async with self._lock:
+            if self.browser is None or self.browser.stopped:
+                self.browser = await start_browser()
+                self.pool = TabPool(self.browser, self.concurrency, self.blocking)
+
+    async def fetch(
+        self, urls: list[str], max_wait, extract: str = "auto", size_report: bool = False,
+        timeout: float = DEFAULT_URL_TIMEOUT,
+    ) -> list[dict[str, str]]:
+        await self.ensure_browser()
+        return await fetch_pages(self.pool, urls, max_wait, extract, size_report, timeout)
+
+    async def stop(self):
+        if self.browser is not None:
+            await self.pool.close()
+            await self.browser.stop()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个 HTTP/1.1 请求（只支持 /health 与 /fetch，响应后关闭连接）。"""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if len(request_line) < 2:
+                status, payload = 400, {"error": "bad request"}
+            elif request_line[:2] == ["GET", "/health"]:
+                status, payload = 200, {"status": "ok"}
+            elif request_line[:2] == ["POST", "/fetch"]:
+                params = json.loads(body or b"{}")
+                results = await self.fetch(
+                    params.get("urls") or [],
+                    params.get("max_wait", DEFAULT_MAX_WAIT),
+                    params.get("extract", "auto"),
+                    bool(params.get("size_report")),
+                    float(params.get("timeout", DEFAULT_URL_TIMEOUT)),
+                )
+                status, payload = 200, {"results": results}
+            else:
+                status, payload = 404, {"error": "not found"}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def main():
+    default_host, _, default_port = DEFAULT_DAEMON_ADDRESS.rpartition(":")
+    parser = argparse.ArgumentParser(description="Keep a headless browser warm and serve web_fetch requests over localhost HTTP.")
+    parser.add_argument("--host", default=default_host, help=f"Listen address (default: {default_host})")
+    parser.add_argument("--port", type=int, default=int(default_port), help=f"Listen port (default: {default_port})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Maximum number of tabs fetching at the same time (default: {DEFAULT_CONCURRENCY})")
+    add_blocking_arguments(parser)
+    args = parser.parse_args()
+
+    daemon = FetchDaemon(args.concurrency, blocking_from_args(args))
+    # 启动时即预热浏览器，第一个请求也无需等待 Chrome 启动
+    await daemon.ensure_browser()
+    server = await asyncio.start_server(daemon.handle, args.host, args.port)
+    print(f"web_daemon listening on http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await daemon.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -2,142 +2,1044 @@
 # dependencies = [
 #   "zendriver",
 #   "readability-lxml",
+#   "httpx[http2]",
+#   "tldextract>=5.3",
 # ]
 # ///
 
 import argparse
 import asyncio
+import json
+import os
+import socket
+import sys
+import urllib.request
+from collections.abc import AsyncIterable
+from urllib.parse import urlsplit
 
+import httpx
+import tldextract
 import zendriver as zd
+from zendriver import cdp
 from readability import Document
 
+from html_markdown import html_to_markdown
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateFilter, dedupe_pages
+from page_cache import DEFAULT_TTL, PageCache
+from passages import DEFAULT_MAX_CHARS, DEFAULT_TOP_K, select_passages
+
 import re
-import html
-
-def _strip_tags(text: str) -> str:
-    """Remove HTML tags and decode entities."""
-    text = re.sub(r'<script[\s\S]*?</script>', '', text, flags=re.I)
-    text = re.sub(r'<style[\s\S]*?</style>', '', text, flags=re.I)
-    text = re.sub(r'<[^>]+>', '', text)
-    return html.unescape(text).strip()
-
-
-def _normalize(text: str) -> str:
-    """Normalize whitespace."""
-    text = re.sub(r'[ \t]+', ' ', text)
-    return re.sub(r'[ \n]{3,}', '\n\n', text).strip()
-
-def _to_markdown(html_content: str) -> str:
-    """Convert HTML to markdown."""
-    text = re.sub(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>([\s\S]*?)</a>',
-                lambda m: f'[{_strip_tags(m[2])}]({m[1]})', html_content, flags=re.I)
-    text = re.sub(r'<h([1-6])[^>]*>([\s\S]*?)</h\1>',
-                lambda m: f'\n{"#" * int(m[1])} {_strip_tags(m[2])}\n', text, flags=re.I)
-    text = re.sub(r'<li[^>]*>([\s\S]*?)</li>', lambda m: f'\n- {_strip_tags(m[1])}', text, flags=re.I)
-    text = re.sub(r'</(p|div|section|article)>', '\n\n', text, flags=re.I)
-    text = re.sub(r'<(br|hr)\s*/?>', '\n', text, flags=re.I)
-    return _normalize(_strip_tags(text))
-
-async def fetch_page_content(browser, url):
+
+# 页面就绪判定参数（单位：秒）
+DEFAULT_MAX_WAIT = 15      # 单个 URL 最长等待时间，超时后直接取当前 DOM
+QUIET_PERIOD = 0.5         # 网络与 DOM 需同时保持安静的时长
+POLL_INTERVAL = 0.1        # 轮询间隔
+NETWORK_IDLE_INFLIGHT = 2  # 在途请求数不超过该值即视为网络空闲（同 networkidle2，容忍长连接/心跳）
+
+DEFAULT_CONCURRENCY = 4    # 同时打开的标签页上限
+DEFAULT_URL_TIMEOUT = 30   # 单个 URL 每条通道的最长处理时间（秒），超时记为 timeout
+
+# 浏览器通道的请求拦截（CDP Fetch）：正文提取用不到的资源类型与广告/统计域名直接在请求阶段失败
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["Image", "Media", "Font", "Stylesheet", "Ping", "Manifest", "TextTrack"]
+DEFAULT_BLOCKED_DOMAINS = [
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "amazon-adsystem.com",
+    "facebook.net", "scorecardresearch.com", "hotjar.com", "clarity.ms", "taboola.com", "outbrain.com",
+    "criteo.com", "adnxs.com", "mixpanel.com", "segment.io", "nr-data.net", "hm.baidu.com", "cnzz.com",
+]
+DEFAULT_BLOCKING = {
+    "types": DEFAULT_BLOCKED_RESOURCE_TYPES,
+    "domains": DEFAULT_BLOCKED_DOMAINS,
+    "third_party_frames": True,  # 拦截与页面不同站点的 iframe
+}
+
+# 正文提取方式：readability 只保留主体文章；full 转换整页；auto 在 Readability 结果足够长时用它，否则回退整页
+EXTRACT_MODES = ["auto", "readability", "full"]
+
+# HTTP 快速通道参数
+FETCH_MODES = ["auto", "http", "browser"]  # auto: 先 HTTP，内容不足再升级到浏览器
+MIN_CONTENT_LENGTH = 500   # HTTP 通道提取出的正文少于该长度时升级到浏览器
+JS_NOTICE_MAX_LENGTH = 2000  # 正文中出现“请启用 JavaScript”提示且长度不足该值时，视为需要 JS 渲染
+HTTP_TIMEOUT = 10
+HTTP_MAX_CONNECTIONS = 20
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+# 页面需要 JavaScript 才能渲染的典型特征：空的前端框架挂载点，以及“请启用 JavaScript”提示
+_EMPTY_APP_ROOT = re.compile(r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I)
+_JS_NOTICE = re.compile(r'enable javascript|javascript is (?:disabled|required)|requires javascript', re.I)
+
+DEFAULT_DAEMON_ADDRESS = "127.0.0.1:8765"  # web_daemon.py 的默认监听地址，可用环境变量 WEB_FETCH_DAEMON 覆盖
+DAEMON_CONNECT_TIMEOUT = 0.2               # 探测守护进程是否存在的连接超时
+
+# 在页面中安装 MutationObserver，记录最近一次 DOM 变化的时间，并返回当前就绪状态
+_READY_STATE_JS = """
+(() => {
+    if (!window.__wfLastMutation) {
+        window.__wfLastMutation = performance.now();
+        new MutationObserver(() => { window.__wfLastMutation = performance.now(); })
+            .observe(document, {childList: true, subtree: true, characterData: true});
+    }
+    return JSON.stringify({
+        href: location.href,
+        stale: !!window.__wfStale,
+        readyState: document.readyState,
+        hasBody: !!document.body,
+        domQuietMs: performance.now() - window.__wfLastMutation,
+    });
+})()
+"""
+
+def _attach_network_tracker(tab) -> dict:
+    """
+    通过 CDP Network 事件统计标签页的在途请求，用于判定网络是否空闲。
+
+    返回的状态字典会被事件回调持续更新（navigate() 在每次导航前重置计数）：
+        - inflight (set): 尚未完成的 request_id 集合
+        - last_activity (float): 最近一次网络事件的时间（事件循环时钟）
+        - bytes (float): 已完成请求实际传输的字节数
+        - blocked (dict): 被请求拦截的请求数，按资源类型统计（见 _install_request_blocking）
+    """
+    loop = asyncio.get_running_loop()
+    state = {"inflight": set(), "last_activity": loop.time(), "bytes": 0, "blocked": {}}
+
+    def on_request(event: cdp.network.RequestWillBeSent):
+        state["inflight"].add(event.request_id)
+        state["last_activity"] = loop.time()
+
+    def on_done(event):
+        state["inflight"].discard(event.request_id)
+        state["last_activity"] = loop.time()
+
+    def on_finished(event: cdp.network.LoadingFinished):
+        state["bytes"] += event.encoded_data_length
+        on_done(event)
+
+    tab.add_handler(cdp.network.RequestWillBeSent, on_request)
+    tab.add_handler(cdp.network.LoadingFinished, on_finished)
+    tab.add_handler(cdp.network.LoadingFailed, on_done)
+    return state
+
+
+# 使用 tldextract 自带的公共后缀列表快照，不联网更新；包含私有后缀（github.io 等），每个用户子域各算一个站点
+_PUBLIC_SUFFIXES = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None, include_psl_private_domains=True)
+
+
+def _site(url: str) -> str:
+    """
+    站点标识：公共后缀之下的可注册域名（news.example.com → example.com，news.bbc.co.uk → bbc.co.uk，
+    a.github.io → a.github.io），用于区分第三方 iframe；IP 地址、localhost 等没有公共后缀的主机返回主机名本身。
+    """
+    host = urlsplit(url).hostname or ""
+    return _PUBLIC_SUFFIXES(host).top_domain_under_public_suffix or host
+
+
+async def _install_request_blocking(tab, network: dict, blocking: dict):
+    """
+    通过 CDP Fetch 拦截正文提取用不到的请求，拦截计数写入 network["blocked"]。
+
+    只为需要拦截的资源类型/域名注册拦截规则，其余请求不会被暂停，不增加额外往返；
+    开启 third_party_frames 时还会暂停文档请求，放行主框架和同站 iframe，拦截第三方 iframe。
+    被拦截的请求根本不会发出，因此只能统计请求数，实际节省的字节数无从得知。
+    """
+    patterns = [
+        cdp.fetch.RequestPattern(url_pattern="*", resource_type=cdp.network.ResourceType(t))
+        for t in blocking.get("types") or []
+    ]
+    for domain in blocking.get("domains") or []:
+        patterns.append(cdp.fetch.RequestPattern(url_pattern=f"*://{domain}/*"))
+        patterns.append(cdp.fetch.RequestPattern(url_pattern=f"*://*.{domain}/*"))
+    if blocking.get("third_party_frames"):
+        patterns.append(cdp.fetch.RequestPattern(url_pattern="*", resource_type=cdp.network.ResourceType.DOCUMENT))
+    if not patterns:
+        return
+
+    async def on_paused(event: cdp.fetch.RequestPaused):
+        resource_type = event.resource_type.value
+        try:
+            if resource_type == "Document" and (
+                event.frame_id == tab.target_id or _site(event.request.url) == _site(network.get("page_url", ""))
+            ):
+                await tab.send(cdp.fetch.continue_request(event.request_id))
+                return
+            network["blocked"][resource_type] = network["blocked"].get(resource_type, 0) + 1
+            await tab.send(cdp.fetch.fail_request(event.request_id, cdp.network.ErrorReason.BLOCKED_BY_CLIENT))
+        except Exception:
+            # 标签页已关闭或请求已被取消
+            pass
+
+    # 先手动启用 Fetch 域（带拦截规则），否则注册回调后 zendriver 会以默认规则启用它并暂停所有请求
+    await tab.send(cdp.fetch.enable(patterns=patterns))
+    tab.add_handler(cdp.fetch.RequestPaused, on_paused)
+
+
+async def wait_for_page_ready(tab, network: dict, max_wait: float = DEFAULT_MAX_WAIT) -> float:
+    """
+    自适应等待页面就绪，取代固定时长的 sleep。
+
+    就绪条件（需同时满足）:
+        - 已离开 about:blank 及上一个页面，document.readyState 为 "complete" 且存在 body
+        - 在途网络请求数不超过 NETWORK_IDLE_INFLIGHT，且已持续 QUIET_PERIOD 秒
+        - DOM 在 QUIET_PERIOD 秒内没有发生变化（MutationObserver）
+    静态页面通常在加载完成后约 QUIET_PERIOD 秒即返回；SPA 页面会一直等到
+    异步渲染结束，但最多等待 max_wait 秒。
+
+    返回:
+        float: 实际等待的秒数。
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + max_wait
+    while loop.time() < deadline:
+        try:
+            state = json.loads(await tab.evaluate(_READY_STATE_JS))
+        except Exception:
+            # 导航过程中执行上下文可能被销毁，稍后重试
+            state = None
+
+        now = loop.time()
+        if (
+            state
+            and not state["stale"]
+            and state["href"] != "about:blank"
+            and state["readyState"] == "complete"
+            and state["hasBody"]
+            and state["domQuietMs"] >= QUIET_PERIOD * 1000
+            and len(network["inflight"]) <= NETWORK_IDLE_INFLIGHT
+            and now - network["last_activity"] >= QUIET_PERIOD
+        ):
+            break
+        await asyncio.sleep(POLL_INTERVAL)
+    return loop.time() - start
+
+
+class TabPool:
+    """
+    固定容量的标签页池：限制同时打开的标签页数量，并在不同 URL 之间复用已预热的标签页。
+
+    标签页按需创建，数量不超过 size；池满时 acquire() 会等待其他任务归还或关闭标签页（背压），
+    因此无论 URL 数量多少，浏览器内存占用都保持在常量级别。每个标签页在创建时挂上一次
+    网络监听（见 _attach_network_tracker）和请求拦截（blocking，见 _install_request_blocking，
+    传 None 关闭），之后随标签页一起复用。
+
+    示例:
+        pool = TabPool(browser, size=4)
+        tab, network = await pool.acquire()
+        try:
+            ...
+        finally:
+            await pool.release(tab, network)
+        await pool.close()
+    """
+
+    def __init__(self, browser, size: int = DEFAULT_CONCURRENCY, blocking: dict | None = DEFAULT_BLOCKING):
+        self.browser = browser
+        self.size = max(1, size)
+        self.blocking = blocking
+        # 名额由信号量计数：归还或关闭标签页都会释放名额，唤醒正在等待的 acquire()
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle = asyncio.Queue()
+        self._tabs = []
+
+    async def acquire(self, timeout: float | None = None):
+        """
+        取出一个空闲标签页，没有空闲的则新建；池满则等待归还。返回 (tab, network)。
+        timeout 秒内没有空闲名额（或新建标签页超时）时抛出 asyncio.TimeoutError。
+        """
+        waiter = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException:
+            # 超时或被取消时名额可能恰好已经到手（Python ≤3.11 的 wait_for 会丢掉这个结果），到手即归还
+            waiter.cancel()
+            waiter.add_done_callback(self._return_unused_slot)
+            raise
+        tab = None
+        try:
+            if not self._idle.empty():
+                return self._idle.get_nowait()
+            tab = await asyncio.wait_for(self.browser.get("about:blank", new_tab=True), timeout)
+            self._tabs.append(tab)
+            network = _attach_network_tracker(tab)
+            if self.blocking:
+                await _install_request_blocking(tab, network, self.blocking)
+            return tab, network
+        except BaseException:
+            if tab is not None:
+                await self._close_tab(tab)
+            self._slots.release()
+            raise
+
+    async def release(self, tab, network, discard: bool = False):
+        """归还标签页；discard 为 True 时（例如标签页已崩溃）关闭它，空出的名额留给下一次 acquire() 新建。"""
+        try:
+            if discard:
+                await self._close_tab(tab)
+            else:
+                self._idle.put_nowait((tab, network))
+        finally:
+            self._slots.release()
+
+    def _return_unused_slot(self, waiter: asyncio.Future):
+        if not waiter.cancelled() and waiter.exception() is None:
+            self._slots.release()
+
+    async def _close_tab(self, tab):
+        if tab in self._tabs:
+            self._tabs.remove(tab)
+        try:
+            await tab.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        """关闭池中所有标签页。"""
+        for tab in self._tabs:
+            try:
+                await tab.close()
+            except Exception:
+                pass
+        self._tabs.clear()
+        self._idle = asyncio.Queue()
+
+
+async def navigate(tab, network: dict, url: str):
+    """
+    在（可能被复用的）标签页中打开 url。
+
+    导航前给旧页面打上 __wfStale 标记并清空在途请求，避免 wait_for_page_ready
+    把上一个页面误判为已就绪。
+    """
+    try:
+        await tab.evaluate("window.__wfStale = true")
+    except Exception:
+        pass
+    network["inflight"].clear()
+    network["last_activity"] = asyncio.get_running_loop().time()
+    network["bytes"] = 0
+    network["blocked"] = {}
+    network["page_url"] = url
+    await tab.send(cdp.page.navigate(url))
+
+
+def extract_content(
+    page_html: str,
+    url: str | None = None,
+    extract: str = "auto",
+    size_report: bool = False,
+) -> tuple[str, str, dict]:
+    """
+    用 Readability 解析网页，返回 (标题, Markdown 正文, 体积统计)。HTTP 通道与浏览器通道共用。
+
+    参数:
+        extract (str): "readability" 只转换 Readability 识别出的主体文章（去掉导航、页脚、
+            Cookie 提示等）；"full" 转换整页；"auto"（默认）在 Readability 正文不少于
+            MIN_CONTENT_LENGTH 时使用它，否则回退整页。
+        size_report (bool): 为 True 时额外转换一次整页，在统计中给出 full_bytes 以便对比节省的体积。
+
+    返回的体积统计:
+        - extract: 实际使用的提取方式（"readability" 或 "full"）
+        - html_bytes: 原始 HTML 字节数
+        - body_bytes: 返回正文的字节数
+        - full_bytes: 整页 Markdown 的字节数（仅 size_report 时提供）
+    """
+    doc = Document(page_html)
+    title = doc.title()
+
+    content = None
+    used = "full"
+    if extract != "full":
+        try:
+            content = html_to_markdown(doc.summary(html_partial=True), base_url=url)
+            used = "readability"
+        except Exception:
+            content = None
+        if extract == "auto" and (content is None or len(content) < MIN_CONTENT_LENGTH):
+            content = None
+            used = "full"
+    full = None
+    if content is None or size_report:
+        full = html_to_markdown(page_html, base_url=url)
+    if content is None:
+        content = full or ""
+
+    stats = {
+        "extract": used,
+        "html_bytes": len(page_html.encode()),
+        "body_bytes": len(content.encode()),
+    }
+    if size_report:
+        stats["full_bytes"] = len(full.encode())
+    return title, content, stats
+
+
+def _needs_browser(page_html: str, content: str) -> bool:
+    """判断 HTTP 通道的结果是否不可用（正文过短或页面依赖 JavaScript 渲染）。"""
+    if len(content) < MIN_CONTENT_LENGTH or _EMPTY_APP_ROOT.search(page_html):
+        return True
+    return len(content) < JS_NOTICE_MAX_LENGTH and bool(_JS_NOTICE.search(content))
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """创建带连接池的 HTTP 客户端（keep-alive + HTTP/2），供同一批 URL 共用。"""
+    return httpx.AsyncClient(
+        http2=True,
+        follow_redirects=True,
+        headers=HTTP_HEADERS,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+    )
+
+
+async def fetch_page_http(
+    client: httpx.AsyncClient,
+    url: str,
+    cached: dict | None = None,
+    extract: str = "auto",
+    size_report: bool = False,
+):
+    """
+    HTTP 快速通道：不启动浏览器，直接请求服务端渲染的 HTML 并提取正文。
+
+    参数:
+        cached (dict | None): 已过期的缓存条目；带有 ETag/Last-Modified 时发送条件请求，
+            服务端返回 304 则直接沿用缓存内容。
+
+    返回:
+        tuple | None: 成功时返回 (title, url, content, stats, validators)，stats 见 extract_content，validators 为
+        {"etag", "last_modified", "not_modified"}；请求失败、非 HTML、正文过短或页面依赖
+        JavaScript 渲染时返回 None，由调用方升级到浏览器通道。
+    """
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        resp = await client.get(url, headers=headers)
+        validators = {
+            "etag": resp.headers.get("etag"),
+            "last_modified": resp.headers.get("last-modified"),
+            "not_modified": resp.status_code == 304,
+        }
+        if resp.status_code == 304 and cached:
+            return cached["title"], url, cached["body"], cached.get("stats") or {}, validators
+        if resp.status_code >= 400 or "html" not in resp.headers.get("content-type", ""):
+            return None
+        page_html = resp.text
+        title, content, stats = await asyncio.to_thread(extract_content, page_html, str(resp.url), extract, size_report)
+        if _needs_browser(page_html, content):
+            return None
+        return title, url, content, stats, validators
+    except Exception:
+        return None
+
+
+async def fetch_page_content(
+    pool: TabPool,
+    url,
+    max_wait: float = DEFAULT_MAX_WAIT,
+    extract: str = "auto",
+    size_report: bool = False,
+    timeout: float = DEFAULT_URL_TIMEOUT,
+):
     """
     从指定URL的网页中提取标题和可读内容。
 
     功能说明:
-        打开网页 → 等待加载 → 提取正文 → 用Readability解析 → 转为Markdown并提取文本 → 异常则返回默认值 → 关闭标签页。
+        从标签页池取出标签页 → 打开网页 → 自适应等待页面就绪（网络空闲 + DOM 静止，最长 max_wait 秒） → 提取正文 → 用Readability解析 → 转为Markdown并提取文本 → 超时或异常则返回默认值 → 归还（出错时关闭）标签页。
 
     参数:
-        browser (Browser): 浏览器实例，用于打开新标签页并操作网页。
+        pool (TabPool): 标签页池，用于限制并发并复用标签页。
         url (str): 要抓取的网页URL地址。
+        max_wait (float): 等待页面就绪的最长秒数，默认 DEFAULT_MAX_WAIT。
+        extract (str): 正文提取方式，见 extract_content。
+        size_report (bool): 是否在体积统计中给出整页 Markdown 的大小。
+        timeout (float): 等待空闲标签页的最长秒数，以及从拿到标签页起加载并提取单个页面的最长秒数，
+            默认 DEFAULT_URL_TIMEOUT；任一阶段超时都返回 "timeout"。
 
     返回:
-        tuple: 包含三个元素的元组：
+        tuple: 包含四个元素的元组：
             - title (str): 页面标题，若提取失败则返回 "NO_TITLE"。
             - url (str): 原始URL，用于标识来源。
             - content (str): 提取后的文章正文内容，以纯文本形式呈现；若提取失败则返回 "NO_CONTENT"。
+            - stats (dict): 体积统计（见 extract_content），另含 transferred_bytes（实际传输字节数）、
+              blocked_requests 与 blocked_by_type（被请求拦截的请求数）；提取失败时为
+              {"status": "timeout" | "error", "error": 错误信息}。
 
     示例:
-        result = await fetch_page_content(browser, "https://example.com/article")
-        title, url, content = result
+        result = await fetch_page_content(TabPool(browser), "https://example.com/article")
+        title, url, content, stats = result
         print(f"标题: {title}")
         print(f"内容: {content}")
     """
 
     try:
-        tab = await browser.get(url, new_tab=True)
-        await tab.select('body', timeout=50)
-        await tab.sleep(10)
+        # 等待空闲标签页同样受 timeout 限制，池被占满时排队的 URL 不会无限期等待
+        tab, network = await pool.acquire(timeout)
+    except asyncio.TimeoutError:
+        return "NO_TITLE", url, "NO_CONTENT", {"status": "timeout", "error": f"no free tab after {timeout}s"}
+    except Exception as e:
+        return "NO_TITLE", url, "NO_CONTENT", {"status": "error", "error": str(e) or type(e).__name__}
+
+    async def load():
+        await navigate(tab, network, url)
+        await wait_for_page_ready(tab, network, max_wait)
         content = await tab.get_content()
 
         # 使用 Readability-lxml 提取文章内容
-        doc = Document(content)
-        title = doc.title()
-        # content = _to_markdown(doc.summary())
-        content = _to_markdown(content)
-
-        await tab.close()  # 可选：立即关闭 tab，节省资源
-        return title, url, content
-    except:
-        return "NO_TITLE", url, "NO_CONTENT"
+        title, content, stats = await asyncio.to_thread(extract_content, content, url, extract, size_report)
+        stats["transferred_bytes"] = int(network["bytes"])
+        stats["blocked_requests"] = sum(network["blocked"].values())
+        stats["blocked_by_type"] = dict(network["blocked"])
+        return title, content, stats
+
+    # 超时、出错或被取消时标签页可能卡在加载中，直接关闭而不放回池中
+    discard = True
+    try:
+        title, content, stats = await asyncio.wait_for(load(), timeout)
+        discard = False
+        return title, url, content, stats
+    except asyncio.TimeoutError:
+        return "NO_TITLE", url, "NO_CONTENT", {"status": "timeout", "error": f"timed out after {timeout}s"}
+    except Exception as e:
+        return "NO_TITLE", url, "NO_CONTENT", {"status": "error", "error": str(e) or type(e).__name__}
+    finally:
+        await pool.release(tab, network, discard=discard)
     
-async def fetch_relevant_web_pages(search_urls: list[str]) -> list[dict[str, str]]:
-    """
-        异步并发抓取多个网页内容，并过滤掉标题缺失或正文过短的页面。
-        该函数使用无头浏览器（基于 zd 库）访问给定的 URL 列表，提取每个页面的标题、URL 和正文文本。
-        为提升性能和减少资源消耗，浏览器启动时禁用了图片、字体及翻译功能。
-        仅保留满足以下条件的页面：
-            - 页面有有效标题（非 "NO_TITLE"）
-            - 正文内容长度不少于 500 个字符
+async def start_browser():
+    """启动无头浏览器；为提升性能和减少资源消耗，禁用了图片、字体及翻译功能。"""
+    return await zd.start(
+        headless=True,
+        browser_args=[
+            "--disable-images",
+            "--disable-fonts",
+            "--disable-features=TranslateUI",
+            "--disable-features=Translate"
+        ]
+    )
+
+
+async def fetch_pages(
+    pool: TabPool,
+    search_urls: list[str],
+    max_wait: float | dict[str, float] = DEFAULT_MAX_WAIT,
+    extract: str = "auto",
+    size_report: bool = False,
+    timeout: float = DEFAULT_URL_TIMEOUT,
+) -> list[dict[str, str]]:
+    """
+    使用已有的标签页池并发抓取多个网页，每个 URL 返回一条带 status 的结果（见 _page_result）。
+    供 _BrowserTier（进程内模式）和 web_daemon.py（常驻模式）共用。
+    """
+    # 并发获取所有页面内容，同时打开的标签页数量由标签页池限制
+    tasks = [
+        fetch_page_content(
+            pool, url,
+            max_wait.get(url, DEFAULT_MAX_WAIT) if isinstance(max_wait, dict) else max_wait,
+            extract, size_report, timeout,
+        )
+        for url in search_urls
+    ]
+    return [_page_result("browser", *page) for page in await asyncio.gather(*tasks)]
+
+
+def _page_result(tier: str, title: str, url: str, content: str, stats: dict) -> dict:
+    """把 fetch_page_content 的返回值转为结果字典；失败时 title/body 为 None，status 给出原因。"""
+    if title == "NO_TITLE":
+        return {
+            "title": None, "href": url, "body": None, "tier": tier,
+            "status": stats.get("status", "error"), "error": stats.get("error"),
+        }
+    return {"title": title, "href": url, "body": content, "tier": tier, "status": "ok", "stats": stats}
+
+
+def _daemon_address() -> tuple[str, int]:
+    host, _, port = os.environ.get("WEB_FETCH_DAEMON", DEFAULT_DAEMON_ADDRESS).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _daemon_available() -> bool:
+    # 用极短的超时探测端口，避免守护进程不存在时拖慢每次调用
+    try:
+        socket.create_connection(_daemon_address(), timeout=DAEMON_CONNECT_TIMEOUT).close()
+        return True
+    except OSError:
+        return False
+
+
+def _fetch_via_daemon(
+    search_urls: list[str],
+    max_wait: float | dict[str, float],
+    extract: str = "auto",
+    size_report: bool = False,
+    timeout: float = DEFAULT_URL_TIMEOUT,
+):
+    """
+    把抓取请求交给常驻的 web_daemon.py。
+    守护进程未启动（连接被拒绝/超时）或返回错误时返回 None，由调用方回退到进程内模式。
+    """
+    if not _daemon_available():
+        return None
+
+    host, port = _daemon_address()
+    payload = json.dumps({
+        "urls": search_urls, "max_wait": max_wait, "extract": extract, "size_report": size_report, "timeout": timeout,
+    }).encode()
+    request = urllib.request.Request(
+        f"http://{host}:{port}/fetch", data=payload,
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    try:
+        # 守护进程排队时间不计入 timeout，这里只防止连接永久挂起
+        with urllib.request.urlopen(request, timeout=timeout * len(search_urls) + DAEMON_CONNECT_TIMEOUT) as resp:
+            return json.loads(resp.read())["results"]
+    except Exception as e:
+        print(f"web_daemon request failed, falling back to in-process fetch: {e}", file=sys.stderr)
+        return None
+
+
+class _BrowserTier:
+    """
+    浏览器通道：优先把 URL 交给守护进程，否则在进程内启动浏览器。
+    浏览器只在第一个 URL 需要升级时才启动，所有 URL 都由 HTTP 通道完成时不会启动 Chrome。
+    """
+
+    def __init__(self, concurrency: int, use_daemon: bool, extract: str, size_report: bool, blocking: dict | None):
+        self.concurrency = concurrency
+        self.blocking = blocking
+        self.use_daemon = use_daemon
+        self.extract = extract
+        self.size_report = size_report
+        self.browser = None
+        self.pool = None
+        self._lock = asyncio.Lock()
+        self._failed = False
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if self.browser is None and not self._failed:
+                try:
+                    self.browser = await start_browser()
+                    self.pool = TabPool(self.browser, self.concurrency, self.blocking)
+                except Exception as e:
+                    print(f"Error web searching: {str(e)}", file=sys.stderr)
+                    self._failed = True
+
+    async def warm(self):
+        """提前启动浏览器（守护进程可用时无需启动），让 Chrome 启动与其他工作（如搜索）重叠。"""
+        if self.use_daemon and await asyncio.to_thread(_daemon_available):
+            return
+        await self._ensure_browser()
+
+    async def fetch(self, url: str, max_wait: float, timeout: float) -> dict:
+        """抓取单个 URL，返回带 status 的结果字典（见 _page_result）。"""
+        if self.use_daemon:
+            results = await asyncio.to_thread(
+                _fetch_via_daemon, [url], max_wait, self.extract, self.size_report, timeout,
+            )
+            if results:
+                return results[0]
+            # 守护进程不存在：后续 URL 不再探测
+            self.use_daemon = False
+
+        await self._ensure_browser()
+        if self.pool is None:
+            return _page_result("browser", "NO_TITLE", url, "NO_CONTENT", {"error": "browser unavailable"})
+        page = await fetch_page_content(self.pool, url, max_wait, self.extract, self.size_report, timeout)
+        return _page_result("browser", *page)
+
+    async def close(self):
+        if self.browser is not None:
+            await self.pool.close()
+            await self.browser.stop()
+
+
+async def iter_relevant_web_pages(
+    search_urls: list[str] | AsyncIterable[str],
+    max_wait: float | dict[str, float] = DEFAULT_MAX_WAIT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_daemon: bool = True,
+    mode: str = "auto",
+    use_cache: bool = True,
+    refresh: bool = False,
+    cache_ttl: float = DEFAULT_TTL,
+    extract: str = "auto",
+    size_report: bool = False,
+    blocking: dict | None = DEFAULT_BLOCKING,
+    timeout: float = DEFAULT_URL_TIMEOUT,
+    total_timeout: float | None = None,
+    prewarm: bool = False,
+    query: str | None = None,
+    top_k: int = DEFAULT_TOP_K,
+    max_chars: int = DEFAULT_MAX_CHARS,
+):
+    """
+    与 fetch_relevant_web_pages 参数相同的异步生成器：每个 URL 一有结果就立即产出（不保证输入顺序）。
+
+    search_urls 也可以是异步可迭代对象（例如边搜索边产出 URL 的异步生成器）：每取到一个新 URL
+    就立即开始抓取，重复的 URL 只抓一次；提前停止迭代时该来源也会被关闭。prewarm 为 True 时
+    在开始时就启动浏览器（守护进程可用时跳过），使 Chrome 的启动与 URL 的产生重叠。
+
+    缓存命中的页面最先产出；HTTP 通道失败或超时的 URL 立即单独升级到浏览器通道，
+    无需等待整批 HTTP 请求结束。调用方提前停止迭代时，未完成的抓取会被取消，浏览器随之关闭。
+
+    每个 URL 恰好产出一条结果，status 为 "ok"、"timeout" 或 "error"，elapsed_ms 为该 URL 从开始到
+    出结果的耗时；失败结果的 title/body 为 None，error 给出原因。到达 total_timeout 时，
+    所有未完成的 URL 立即以 "timeout" 产出，其抓取任务被取消（标签页随之关闭）。
+
+    示例:
+        async for page in iter_relevant_web_pages(urls):
+            print(json.dumps(page, ensure_ascii=False), flush=True)
+    """
+    if mode not in FETCH_MODES:
+        raise ValueError(f"mode must be one of {FETCH_MODES}")
+    if extract not in EXTRACT_MODES:
+        raise ValueError(f"extract must be one of {EXTRACT_MODES}")
+
+    def wait_for(url: str) -> float:
+        return max_wait.get(url, DEFAULT_MAX_WAIT) if isinstance(max_wait, dict) else max_wait
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + total_timeout if total_timeout is not None else None
+
+    def finished(result: dict) -> dict:
+        result.setdefault("status", "ok")
+        result["elapsed_ms"] = round((loop.time() - started) * 1000)
+        if query and result["status"] == "ok":
+            # 缓存中保存的是完整正文，段落筛选只作用于输出
+            result["body"], info = select_passages(result["body"], query, top_k, max_chars)
+            result["stats"] = {**(result.get("stats") or {}), "passages": info}
+        return result
+
+    cache = PageCache(ttl=cache_ttl) if use_cache else None
+    stale_entries = {}
+    client = create_http_client() if mode != "browser" else None
+    browser = _BrowserTier(concurrency, use_daemon, extract, size_report, blocking)
+    # 浏览器预热与 URL 的产生（例如搜索）并行进行
+    warm = asyncio.create_task(browser.warm()) if prewarm and mode != "http" else None
+
+    async def http_task(url):
+        try:
+            page = await asyncio.wait_for(
+                fetch_page_http(client, url, stale_entries.get(url), extract, size_report), timeout,
+            )
+        except asyncio.TimeoutError:
+            page = {"status": "timeout", "error": f"timed out after {timeout}s"}
+        return "http", url, page
+
+    async def browser_task(url):
+        return "browser", url, await browser.fetch(url, wait_for(url), timeout)
+
+    # 任务 → (URL, 通道)，全局超时时据此为未完成的 URL 产出 timeout 结果
+    running = {}
+
+    def start(url: str) -> dict | None:
+        """缓存命中时返回结果，否则为该 URL 创建抓取任务并返回 None。"""
+        entry = cache.get(url, extract) if cache and not refresh else None
+        if entry is not None and cache.is_fresh(entry):
+            return {"title": entry["title"], "href": url, "body": entry["body"], "tier": "cache", "stats": entry.get("stats") or {}}
+        if entry is not None:
+            stale_entries[url] = entry
+        if client:
+            running[asyncio.create_task(http_task(url))] = url, "http"
+        else:
+            running[asyncio.create_task(browser_task(url))] = url, "browser"
+        return None
+
+    # 输入为异步可迭代对象时，由 feeder 任务逐个取出 URL，取到即开始抓取
+    source = feeder = None
+    seen = set()
+    if isinstance(search_urls, AsyncIterable):
+        source = aiter(search_urls)
+        feeder = asyncio.ensure_future(anext(source))
+    else:
+        for url in search_urls:
+            hit = start(url)
+            if hit is not None:
+                yield finished(hit)
+
+    try:
+        while running or feeder:
+            remaining = None if deadline is None else deadline - loop.time()
+            done, _ = await asyncio.wait(
+                [*running, *([feeder] if feeder else [])],
+                timeout=remaining if remaining is None else max(remaining, 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                # 到达全局截止时间：取消剩余任务，其余 URL 记为超时
+                for task, (url, tier) in list(running.items()):
+                    del running[task]
+                    task.cancel()
+                    yield finished({
+                        "title": None, "href": url, "body": None, "tier": tier,
+                        "status": "timeout", "error": f"total timeout of {total_timeout}s reached",
+                    })
+                break
+            if feeder in done:
+                done.discard(feeder)
+                try:
+                    url = feeder.result()
+                except StopAsyncIteration:
+                    feeder = None
+                else:
+                    feeder = asyncio.ensure_future(anext(source))
+                    if url not in seen:
+                        seen.add(url)
+                        hit = start(url)
+                        if hit is not None:
+                            yield finished(hit)
+            for task in done:
+                del running[task]
+                tier, url, page = task.result()
+                if tier == "browser":
+                    if page["status"] == "ok" and cache:
+                        cache.put(url, page, extract)
+                    yield finished(page)
+                    continue
+
+                if page is None or isinstance(page, dict):
+                    # HTTP 通道不可用或超时，立即升级到浏览器通道
+                    if mode != "http":
+                        running[asyncio.create_task(browser_task(url))] = url, "browser"
+                    else:
+                        failure = page or {"status": "error", "error": "no usable content over HTTP"}
+                        yield finished({"title": None, "href": url, "body": None, "tier": "http", **failure})
+                    continue
+                title, _, content, stats, validators = page
+                if validators["not_modified"]:
+                    # 304：内容未变，沿用缓存
+                    cache.revalidated(url, stale_entries[url], extract)
+                    yield finished({"title": title, "href": url, "body": content, "tier": "cache", "stats": stats})
+                    continue
+                result = {"title": title, "href": url, "body": content, "tier": "http", "stats": stats}
+                if cache:
+                    cache.put(url, result, extract, validators["etag"], validators["last_modified"])
+                yield finished(result)
+    finally:
+        for task in running:
+            task.cancel()
+        # 等被取消的抓取退出（归还或关闭标签页）后再关闭浏览器
+        await asyncio.gather(*running, return_exceptions=True)
+        if feeder is not None:
+            # 等取消生效后再关闭 URL 来源，避免关闭一个仍在运行的异步生成器
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+        if source is not None and hasattr(source, "aclose"):
+            await source.aclose()
+        if client is not None:
+            await client.aclose()
+        if warm is not None:
+            await asyncio.gather(warm, return_exceptions=True)
+        await browser.close()
+        if cache:
+            cache.evict()
+
+
+async def fetch_relevant_web_pages(
+    search_urls: list[str],
+    max_wait: float | dict[str, float] = DEFAULT_MAX_WAIT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_daemon: bool = True,
+    mode: str = "auto",
+    use_cache: bool = True,
+    refresh: bool = False,
+    cache_ttl: float = DEFAULT_TTL,
+    extract: str = "auto",
+    size_report: bool = False,
+    blocking: dict | None = DEFAULT_BLOCKING,
+    timeout: float = DEFAULT_URL_TIMEOUT,
+    total_timeout: float | None = None,
+    include_failed: bool = False,
+    dedupe: float | None = None,
+    query: str | None = None,
+    top_k: int = DEFAULT_TOP_K,
+    max_chars: int = DEFAULT_MAX_CHARS,
+) -> list[dict[str, str]]:
+    """
+        异步并发抓取多个网页内容，默认过滤掉抓取失败的页面；按输入顺序返回结果。
+        需要边抓取边处理时使用 iter_relevant_web_pages，它在每个页面完成时立即产出。
+        默认（mode="auto"）先走 HTTP 快速通道：用连接池化的 httpx 客户端直接请求 HTML 并提取正文，
+        只有正文过短（少于 MIN_CONTENT_LENGTH）或页面依赖 JavaScript 渲染时才升级到浏览器通道。
+        浏览器通道中，若本地运行着 web_daemon.py（地址由环境变量 WEB_FETCH_DAEMON 指定，默认 127.0.0.1:8765），
+        则直接复用守护进程中已预热的浏览器，省去每次调用启动 Chrome 的 1–3 秒；
+        否则在进程内使用无头浏览器（基于 zd 库）访问给定的 URL 列表，提取每个页面的标题、URL 和正文文本。
+        过滤规则：
+            - 正文过短（少于 MIN_CONTENT_LENGTH 个字符）不会直接丢弃页面，而是让它从 HTTP 通道升级到浏览器通道；
+              浏览器通道只要取得标题与正文即视为成功，不再按长度过滤
+            - 只保留 status 为 "ok" 的页面（缓存命中、HTTP 或浏览器成功）；include_failed 为 True 时
+              超时或出错的 URL 也会保留
+            - 给出 dedupe 时再去掉近似重复的转载
         参数:
             search_urls (list[str]): 待抓取的网页 URL 列表。
+            max_wait (float | dict[str, float]): 每个 URL 等待页面就绪的最长秒数；
+                传入字典时按 URL 单独配置，未列出的 URL 使用 DEFAULT_MAX_WAIT。
+            concurrency (int): 同时打开的标签页上限，超出的 URL 排队等待空闲标签页。
+                使用守护进程时以守护进程启动时的配置为准。
+            use_daemon (bool): 是否优先尝试守护进程，默认 True。
+            mode (str): "auto"（默认，HTTP 优先、按需升级）、"http"（只走 HTTP）或 "browser"（只走浏览器）。
+            use_cache (bool): 是否使用本地磁盘缓存（见 page_cache.py），默认 True。
+                未过期的条目直接返回；过期条目若带 ETag/Last-Modified 则发送条件请求重新验证。
+            refresh (bool): 忽略已有缓存强制重新抓取，但仍把新结果写入缓存。
+            cache_ttl (float): 缓存有效期（秒），默认 DEFAULT_TTL。
+            extract (str): 正文提取方式，"auto"（默认）、"readability" 或 "full"，见 extract_content。
+                不同提取方式的结果分别缓存。
+            size_report (bool): 为 True 时在 stats 中额外给出整页 Markdown 的大小（full_bytes）。
+            blocking (dict | None): 浏览器通道的请求拦截配置（types、domains、third_party_frames），
+                默认 DEFAULT_BLOCKING，None 表示不拦截。使用守护进程时以守护进程启动时的配置为准。
+            timeout (float): 单个 URL 在每条通道上的最长处理秒数，默认 DEFAULT_URL_TIMEOUT；
+                HTTP 通道超时的 URL 仍会升级到浏览器通道。
+            total_timeout (float | None): 整批抓取的最长秒数，到时未完成的 URL 记为 "timeout"，
+                已完成的结果照常返回；None（默认）表示不限制。
+            include_failed (bool): 是否在结果中保留失败的 URL（title/body 为 None），默认 False。
+            dedupe (float | None): 近似重复的相似度阈值（如 0.8），给出时每组转载只保留正文最完整的一篇，
+                其余记录在保留页面的 "duplicates" 字段中（见 near_duplicates.dedupe_pages）；默认 None 不去重。
+            query (str | None): 给出时把正文切成段落并用 BM25 对该查询打分，只返回最相关的 top_k 段，
+                总长不超过 max_chars 个字符（见 passages.select_passages），stats["passages"] 记录选取情况。
+            top_k (int): 每个页面最多保留的段落数，默认 DEFAULT_TOP_K。
+            max_chars (int): 每个页面保留段落的字符预算，默认 DEFAULT_MAX_CHARS。
         返回:
-            list[dict[str, str]]: 包含有效页面信息的字典列表，每个字典包含：
-                - "title": 网页标题
+            list[dict[str, str]]: 每个 URL 一条结果记录（按输入顺序；include_failed 为 False 时只含成功的页面），每个字典包含：
+                - "title": 网页标题，失败时为 None
                 - "href": 网页 URL
-                - "body": 网页正文文本（纯文本）
+                - "body": 网页正文文本（纯文本），失败时为 None
+                - "tier": 实际提供内容的通道，"cache"、"http" 或 "browser"
+                - "status": "ok"、"timeout" 或 "error"（失败时另有 "error" 字段给出原因）
+                - "elapsed_ms": 该 URL 从开始抓取到出结果的毫秒数
+                - "stats": 体积统计（extract、html_bytes、body_bytes，以及 size_report 时的 full_bytes；
+                  浏览器通道另含 transferred_bytes、blocked_requests、blocked_by_type）
         异常处理:
-            若在抓取过程中发生任何异常，函数将打印错误信息并返回空列表，
-            以确保调用方不会因单个页面失败而中断整体流程。
+            单个 URL 的超时或异常不会中断整批抓取，而是记为该 URL 的 "timeout" / "error" 结果；
+            mode 或 extract 取值无效时抛出 ValueError。
     """
 
-    try:
-        browser = await zd.start(
-            headless=True,
-            browser_args=[
-                "--disable-images",
-                "--disable-fonts",
-                "--disable-features=TranslateUI",
-                "--disable-features=Translate"
-            ]
+    results = [
+        page async for page in iter_relevant_web_pages(
+            search_urls, max_wait, concurrency, use_daemon, mode, use_cache, refresh, cache_ttl, extract, size_report,
+            blocking, timeout, total_timeout, query=query, top_k=top_k, max_chars=max_chars,
+        )
+        if include_failed or page["status"] == "ok"
+    ]
+    # 按输入顺序返回
+    order = {}
+    for i, url in enumerate(search_urls):
+        order.setdefault(url, i)
+    results = sorted(results, key=lambda r: order.get(r["href"], len(order)))
+    if dedupe is not None:
+        ok = dedupe_pages([r for r in results if r["status"] == "ok"], dedupe)
+        results = ok + [r for r in results if r["status"] != "ok"]
+    return results
+
+
+def add_blocking_arguments(parser: argparse.ArgumentParser):
+    """添加请求拦截相关的命令行参数（web_fetch.py 与 web_daemon.py 共用）。"""
+    parser.add_argument("--block-types", default=",".join(DEFAULT_BLOCKED_RESOURCE_TYPES), help=f"Comma-separated CDP resource types to block in the browser tier (default: {','.join(DEFAULT_BLOCKED_RESOURCE_TYPES)})")
+    parser.add_argument("--block-domains", default=",".join(DEFAULT_BLOCKED_DOMAINS), help="Comma-separated domains (and their subdomains) to block in the browser tier (default: common ad/analytics domains)")
+    parser.add_argument("--allow-third-party-frames", action="store_true", help="Do not block iframes from other sites")
+    parser.add_argument("--no-block", action="store_true", help="Disable request blocking in the browser tier")
+
+
+def blocking_from_args(args) -> dict | None:
+    if args.no_block:
+        return None
+    types = [t.strip() for t in args.block_types.split(",") if t.strip()]
+    valid = {t.value for t in cdp.network.ResourceType}
+    unknown = [t for t in types if t not in valid]
+    if unknown:
+        raise ValueError(f"unknown resource types {unknown}; valid types: {sorted(valid)}")
+    return {
+        "types": types,
+        "domains": [d.strip() for d in args.block_domains.split(",") if d.strip()],
+        "third_party_frames": not args.allow_third_party_frames,
+    }
+
+
+def skip_duplicate(duplicates: NearDuplicateFilter, page: dict) -> bool:
+    """流式输出时的去重：与已输出页面近似重复则在 stderr 说明并返回 True。"""
+    match = duplicates.check(page)
+    if match is None:
+        return False
+    print(f"skipped near-duplicate {page['href']} of {match[0]} (similarity {match[1]:.2f})", file=sys.stderr)
+    return True
+
+
+def print_size_report(results: list[dict]):
+    """把每个页面的体积统计打印到 stderr，对比整页与提取后的正文大小。"""
+    print(f"{'extract':<12} {'tier':<8} {'html KB':>9} {'full KB':>9} {'body KB':>9} {'saved':>7} {'net KB':>8} {'blocked':>8}  url", file=sys.stderr)
+    for r in results:
+        if r.get("status", "ok") != "ok":
+            print(f"{'-':<12} {r.get('tier', '-'):<8} {r['status'].upper():>55}  {r['href']}", file=sys.stderr)
+            continue
+        stats = r.get("stats") or {}
+        full = stats.get("full_bytes")
+        body = stats.get("body_bytes", len(r["body"].encode()))
+        saved = f"{1 - body / full:.0%}" if full else "-"
+        print(
+            f"{stats.get('extract', '-'):<12} {r.get('tier', '-'):<8} "
+            f"{stats.get('html_bytes', 0) / 1024:>9.1f} {(full or 0) / 1024:>9.1f} {body / 1024:>9.1f} {saved:>7} "
+            f"{stats.get('transferred_bytes', 0) / 1024:>8.1f} {stats.get('blocked_requests', '-'):>8}  {r['href']}",
+            file=sys.stderr,
         )
-        # 并发获取所有页面内容
-        tasks = [fetch_page_content(browser, url) for url in search_urls]
-        results = await asyncio.gather(*tasks)
-
-        # 打印结果
-        results_list = []
-        for title, url, content in results:
-            if title == "NO_TITLE":
-                continue
-            results_list.append({"title": title, "href": url, "body": content}) 
 
-        return results_list
-    
-    except Exception as e:
-        print(f"Error web searching: {str(e)}")
-        return f"Error web searching: {str(e)}"
-    
-    finally:
-        await browser.stop()
 
 # 主函数：处理命令行参数并执行搜索
 async def main():
     parser = argparse.ArgumentParser(description="Fetch and extract readable content from given URLs using a headless browser.")
     parser.add_argument("--url", action='append', type=str, help="A URL to fetch and extract content from (can be used multiple times)")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT, help=f"Maximum seconds to wait for each page to become ready (default: {DEFAULT_MAX_WAIT})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_URL_TIMEOUT, help=f"Maximum seconds to spend on each URL per tier before giving up on it (default: {DEFAULT_URL_TIMEOUT})")
+    parser.add_argument("--total-timeout", type=float, help="Maximum seconds for the whole batch; unfinished URLs are reported as timed out (default: no limit)")
+    parser.add_argument("--include-failed", action="store_true", help="Also output URLs that failed or timed out, with their status and error")
+    parser.add_argument("--dedupe", type=float, nargs="?", const=DEFAULT_THRESHOLD, metavar="THRESHOLD", help=f"Collapse near-duplicate pages (estimated Jaccard similarity >= THRESHOLD, default {DEFAULT_THRESHOLD}), keeping the most complete copy")
+    parser.add_argument("--query", help="Return only the passages most relevant to this query (BM25) instead of the whole body")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help=f"With --query: maximum number of passages per page (default: {DEFAULT_TOP_K})")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help=f"With --query: character budget for the passages of each page (default: {DEFAULT_MAX_CHARS})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Maximum number of tabs fetching at the same time (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--no-daemon", action="store_true", help="Always start an in-process browser instead of using a running web_daemon.py")
+    parser.add_argument("--mode", choices=FETCH_MODES, default="auto", help="auto: plain HTTP first, headless browser only when needed; http/browser: use only that tier (default: auto)")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the on-disk page cache")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached pages and refetch, updating the cache")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL, help=f"Seconds a cached page stays fresh (default: {DEFAULT_TTL})")
+    parser.add_argument("--extract", choices=EXTRACT_MODES, default="auto", help="readability: main article only; full: whole page; auto: readability when it yields enough text (default: auto)")
+    parser.add_argument("--size-report", action="store_true", help="Print a per-page size report (HTML, full-page and extracted bytes) to stderr")
+    parser.add_argument("--format", choices=["repr", "json", "ndjson"], default="repr", help="repr: Python list; json: one JSON array; ndjson: one JSON line per page as soon as it completes (default: repr)")
+    add_blocking_arguments(parser)
     args = parser.parse_args()
 
-    # 执行搜索
-    results = await fetch_relevant_web_pages(args.url)
-    print(results)
+    kwargs = dict(
+        max_wait=args.max_wait, concurrency=args.concurrency, use_daemon=not args.no_daemon, mode=args.mode,
+        use_cache=not args.no_cache, refresh=args.refresh, cache_ttl=args.cache_ttl,
+        extract=args.extract, size_report=args.size_report, blocking=blocking_from_args(args),
+        timeout=args.timeout, total_timeout=args.total_timeout,
+        query=args.query, top_k=args.top_k, max_chars=args.max_chars,
+    )
+
+    if args.format == "ndjson":
+        # 每个页面完成即输出一行 JSON，消费方无需等待最慢的页面
+        results = []
+        duplicates = NearDuplicateFilter(args.dedupe) if args.dedupe is not None else None
+        async for page in iter_relevant_web_pages(args.url, **kwargs):
+            if page["status"] != "ok" and not args.include_failed:
+                continue
+            if page["status"] == "ok" and duplicates and skip_duplicate(duplicates, page):
+                continue
+            print(json.dumps(page, ensure_ascii=False), flush=True)
+            results.append(page)
+    else:
+        # 执行搜索
+        results = await fetch_relevant_web_pages(args.url, include_failed=args.include_failed, dedupe=args.dedupe, **kwargs)
+        if args.format == "json":
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            print(results)
+
+    if args.size_report:
+        print_size_report(results)
 
 # 作为入口点运行
 if __name__ == "__main__":
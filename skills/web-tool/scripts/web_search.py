@@ -3,6 +3,8 @@
 #   "ddgs",
 #   "zendriver",
 #   "readability-lxml",
+#   "httpx[http2]",
+#   "tldextract>=5.3",
 # ]
 # ///
 
@@ -14,9 +16,76 @@ import argparse
 from ddgs import DDGS
 import json
 import asyncio
+import functools
+import sys
+import threading
+import time
+from contextlib import aclosing
+from urllib.parse import urlsplit, urlunsplit
 
+from near_duplicates import DEFAULT_THRESHOLD
+from page_cache import normalize_url
+from passages import DEFAULT_MAX_CHARS, DEFAULT_TOP_K
+from search_cache import SearchCache
 
-def search(args):
+BACKENDS = ["auto", "bing", "brave", "duckduckgo", "google", "grokipedia", "mojeek", "yandex", "yahoo", "wikipedia"]
+DEFAULT_BACKEND_TIMEOUT = 8  # 多引擎模式下单个引擎的最长等待秒数
+RRF_K = 60                   # 倒数排名融合（RRF）的平滑常数，score = Σ 1 / (RRF_K + rank)
+PIPELINE_CANDIDATE_FACTOR = 2  # --pipeline 时搜索的候选 URL 数为 --max-results 的倍数
+DEFAULT_BATCH_CONCURRENCY = 4  # --batch 时同时进行的查询数
+DEFAULT_RATE_LIMIT = 1.0       # --batch 时同一引擎相邻两次请求的最小间隔（秒）
+PREFETCH_GRACE = 0.5           # --batch 输出结束后最多再等待下一页预取的秒数，超时即放弃
+
+
+def _backend_list(args) -> list[str]:
+    return [b.strip() for b in args.backends.split(",") if b.strip()]
+
+
+def _search_params(args) -> dict:
+    """SearchCache 的键参数（查询词之外）。"""
+    return dict(
+        region=args.region,
+        safesearch=args.safesearch,
+        timelimit=args.timelimit,
+        max_results=args.max_results,
+        page=args.page,
+        backend=",".join(sorted(_backend_list(args))) if args.backends else args.backend,
+    )
+
+
+def search(args, throttle=None):
+    """
+    按命令行参数执行搜索；除非指定 --no-cache，结果经由 SearchCache 缓存（--refresh 时只写不读）。
+    throttle(backends) 在缓存未命中、真正发出请求前调用，用于按引擎限速（见 BackendRateLimiter）。
+    """
+    params = _search_params(args)
+    cache = SearchCache() if not args.no_cache else None
+    try:
+        results = cache.get(args.query, params) if cache and not args.refresh else None
+        if results is None:
+            if throttle:
+                throttle(_backend_list(args) if args.backends else [args.backend])
+            results = _search_uncached(args)
+            if cache and results:
+                cache.put(args.query, params, results)
+        return results
+    finally:
+        if cache:
+            cache.close()
+
+
+def _search_uncached(args):
+    if args.backends:
+        return asyncio.run(fan_out_search(
+            args.query,
+            _backend_list(args),
+            max_results=args.max_results,
+            timeout=args.backend_timeout,
+            region=args.region,
+            safesearch=args.safesearch,
+            timelimit=args.timelimit,
+            page=args.page,
+        ))
     results = DDGS().text(
         query=args.query,
         region=args.region,
@@ -29,6 +98,322 @@ def search(args):
     return results
 
 
+class BackendRateLimiter:
+    """按引擎限速：同一引擎相邻两次请求至少间隔 interval 秒。线程安全，在 search 的工作线程中调用。"""
+
+    def __init__(self, interval: float = DEFAULT_RATE_LIMIT):
+        self.interval = interval
+        self._guard = threading.Lock()
+        self._locks = {}
+        self._last = {}
+
+    def wait(self, backends: list[str]):
+        for backend in sorted(set(backends)):
+            with self._guard:
+                lock = self._locks.setdefault(backend, threading.Lock())
+            # 持锁等待：同一引擎的请求依次间隔发出
+            with lock:
+                delay = self._last.get(backend, float("-inf")) + self.interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self._last[backend] = time.monotonic()
+
+
+def read_queries(path: str) -> list[str]:
+    """读取批量查询：每行一个查询，忽略空行和以 # 开头的行；path 为 "-" 时读标准输入。"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+async def run_batch(args, queries: list[str]):
+    """
+    批量搜索：最多 --batch-concurrency 个查询同时进行，同一引擎的请求按 --rate-limit 限速。
+    每个查询取第 --page 页起的 --pages 页，完成后输出一行 NDJSON：
+    {"query": ..., "pages": [...], "results": [...（每条带 "page"）], "error": 出错时的信息}。
+    启用缓存时，每个查询的下一页在后台预取进缓存，后续翻页直接命中；预取在守护线程中进行，
+    全部输出后最多再等 PREFETCH_GRACE 秒，未完成的预取被放弃，不延长批量搜索的总耗时。
+    """
+    loop = asyncio.get_running_loop()
+    limiter = BackendRateLimiter(args.rate_limit)
+    semaphore = asyncio.Semaphore(args.batch_concurrency)
+    prefetches = []
+
+    async def run_search(query, page, detached=False):
+        query_args = argparse.Namespace(**{**vars(args), "query": query, "page": page})
+        call = functools.partial(search, query_args, limiter.wait)
+        async with semaphore:
+            return await (run_detached(loop, call) if detached else asyncio.to_thread(call))
+
+    async def run_query(query):
+        pages = list(range(args.page, args.page + args.pages))
+        record = {"query": query, "pages": pages, "results": []}
+        try:
+            for page, results in zip(pages, await asyncio.gather(*(run_search(query, p) for p in pages))):
+                record["results"].extend({**r, "page": page} for r in results or [])
+        except Exception as e:
+            record["error"] = str(e)
+        if not args.no_cache and "error" not in record:
+            prefetches.append(asyncio.create_task(run_search(query, args.page + args.pages, detached=True)))
+        return record
+
+    for record in asyncio.as_completed([run_query(q) for q in queries]):
+        print(json.dumps(await record, ensure_ascii=False), flush=True)
+    # 预取只写缓存，失败或未完成都不影响输出
+    if prefetches:
+        await asyncio.wait(prefetches, timeout=PREFETCH_GRACE)
+        for task in prefetches:
+            task.cancel()
+        await asyncio.gather(*prefetches, return_exceptions=True)
+
+
+def print_cache_stats():
+    cache = SearchCache()
+    print(json.dumps(cache.stats(), ensure_ascii=False), file=sys.stderr)
+    cache.close()
+
+
+def ddgs_engine(query: str, backend: str, max_results: int, timeout: float, **options) -> list[dict]:
+    """用 DDGS 查询单个引擎（同步调用，fan_out_search 在线程中执行）。"""
+    return DDGS(timeout=timeout).text(query=query, max_results=max_results, backend=backend, **options)
+
+
+def canonical_url(url: str) -> str:
+    """去重用的 URL 键：在 normalize_url 基础上忽略 http/https、www. 前缀和路径末尾的斜杠。"""
+    parts = urlsplit(normalize_url(url))
+    netloc = parts.netloc.removeprefix("www.")
+    return urlunsplit(("", netloc, parts.path.rstrip("/"), parts.query, ""))
+
+
+def merge_rankings(rankings: dict[str, list[dict]], k: int = RRF_K) -> list[dict]:
+    """
+    用倒数排名融合合并多个引擎的结果：按 canonical_url 去重，每个 URL 的得分为
+    它在各引擎中 1 / (k + 名次) 之和，按得分从高到低返回。
+    每条结果保留首次出现时的字段，正文取各引擎中最长的摘要，另加 "backends"（命中的引擎）和 "score"。
+    """
+    merged = {}
+    for backend, results in rankings.items():
+        for rank, result in enumerate(results, 1):
+            href = result.get("href")
+            if not href:
+                continue
+            key = canonical_url(href)
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {**result, "backends": [], "score": 0.0}
+            elif len(result.get("body") or "") > len(entry.get("body") or ""):
+                entry["body"] = result["body"]
+            if backend not in entry["backends"]:
+                entry["backends"].append(backend)
+                entry["score"] += 1 / (k + rank)
+    return sorted(merged.values(), key=lambda r: r["score"], reverse=True)
+
+
+def run_detached(loop: asyncio.AbstractEventLoop, call) -> asyncio.Future:
+    """
+    在守护线程中执行同步调用 call()，返回 loop 上的 Future。
+
+    与 run_in_executor 不同，守护线程不会在 asyncio.run 或解释器退出时被等待：已放弃的慢引擎
+    不会拖住进程退出（concurrent.futures 的线程池在退出时会 join 所有工作线程，
+    shutdown(cancel_futures=True) 也停不下已在运行的调用）。
+    """
+    future = loop.create_future()
+
+    def settle(method, value):
+        if not future.done():
+            method(value)
+
+    def worker():
+        try:
+            result = call()
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        else:
+            outcome = (future.set_result, result)
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            pass  # 事件循环已关闭：结果无人需要
+
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+
+async def iter_fan_out(
+    query: str,
+    backends: list[str],
+    max_results: int = 10,
+    timeout: float = DEFAULT_BACKEND_TIMEOUT,
+    engine=ddgs_engine,
+    **options,
+):
+    """
+    并发查询多个搜索引擎的异步生成器：每个引擎一返回就产出 (引擎名, 结果列表)。
+
+    每个引擎最多等待 timeout 秒，超时或出错的引擎不产出。提前停止迭代时，仍在查询的引擎被放弃。
+    参数含义同 fan_out_search。
+    """
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        raise ValueError(f"unknown backends {unknown}; valid backends: {BACKENDS}")
+
+    backends = list(dict.fromkeys(backends))
+    loop = asyncio.get_running_loop()
+
+    async def query_backend(backend):
+        # 每个引擎一个守护线程：提前返回或超时后不再等待它，进程也不会因它而延迟退出
+        call = functools.partial(engine, query, backend, max_results, timeout, **options)
+        results = await asyncio.wait_for(run_detached(loop, call), timeout)
+        return backend, results or []
+
+    pending = {asyncio.create_task(query_backend(b)) for b in backends}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    backend, results = task.result()
+                except Exception:
+                    # 超时或引擎报错：按无结果处理
+                    continue
+                yield backend, results
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fan_out_search(
+    query: str,
+    backends: list[str],
+    max_results: int = 10,
+    timeout: float = DEFAULT_BACKEND_TIMEOUT,
+    engine=ddgs_engine,
+    **options,
+) -> list[dict]:
+    """
+    并发查询多个搜索引擎并合并结果（见 merge_rankings），返回前 max_results 条不重复的结果。
+
+    每个引擎最多等待 timeout 秒，超时或出错的引擎被忽略。当已有过半引擎返回且不重复的结果
+    已够 max_results 条时立即返回，不再等待较慢的引擎，因此总耗时约等于较快的那一半引擎。
+
+    参数:
+        query (str): 搜索词。
+        backends (list[str]): 要查询的引擎名，如 ["bing", "brave", "mojeek"]。
+        max_results (int): 返回的结果数，同时作为每个引擎的请求条数。
+        timeout (float): 单个引擎的最长等待秒数。
+        engine (callable): engine(query, backend, max_results, timeout, **options) -> list[dict]，
+            默认 ddgs_engine；可替换为本地桩函数用于测试。
+        **options: 透传给 engine 的参数（region、safesearch、timelimit、page 等）。
+    """
+    rankings = {}
+    quorum = len(set(backends)) // 2 + 1
+    async with aclosing(iter_fan_out(query, backends, max_results, timeout, engine, **options)) as answers:
+        async for backend, results in answers:
+            rankings[backend] = results
+            unique = {canonical_url(r["href"]) for rs in rankings.values() for r in rs if r.get("href")}
+            if len(rankings) >= quorum and len(unique) >= max_results:
+                break
+    return merge_rankings(rankings)[:max_results]
+
+
+async def iter_search_urls(args):
+    """
+    异步产出搜索结果的 URL（按 canonical_url 去重），供边搜索边抓取使用。
+
+    缓存命中或单引擎搜索时整页结果一次产出；多引擎（--backends）时每个引擎一返回就产出
+    其中新出现的 URL，不等待最慢的引擎，全部引擎结束后把合并结果写入缓存。
+    """
+    params = _search_params(args)
+    cache = SearchCache() if not args.no_cache else None
+    seen = set()
+    try:
+        results = cache.get(args.query, params) if cache and not args.refresh else None
+        if results is None and not args.backends:
+            results = await asyncio.to_thread(_search_uncached, args)
+            if cache and results:
+                cache.put(args.query, params, results)
+        if results is not None:
+            for r in results:
+                if r.get("href"):
+                    yield r["href"]
+            return
+
+        rankings = {}
+        answers = iter_fan_out(
+            args.query, _backend_list(args), args.max_results, args.backend_timeout,
+            region=args.region, safesearch=args.safesearch, timelimit=args.timelimit, page=args.page,
+        )
+        async with aclosing(answers):
+            async for backend, hits in answers:
+                rankings[backend] = hits
+                for r in hits:
+                    key = canonical_url(r["href"]) if r.get("href") else None
+                    if key and key not in seen:
+                        seen.add(key)
+                        yield r["href"]
+        merged = merge_rankings(rankings)[:args.max_results]
+        if cache and merged:
+            cache.put(args.query, params, merged)
+    finally:
+        if cache:
+            cache.close()
+
+
+async def pipelined_detailed_content(
+    args, fetch_kwargs: dict, stream: bool = False, dedupe: float | None = None,
+) -> list[dict]:
+    """
+    边搜索边抓取（--pipeline）：浏览器在搜索进行时预热，每个搜索结果 URL 一产出就开始抓取，
+    收集到 --max-results 个正文有效的页面后立即停止，取消其余抓取与仍在进行的搜索。
+    单引擎搜索时 DDGS 一次返回整页结果，抓取在整页结果返回后才开始；多引擎（--backends）时
+    每个引擎一返回就开始抓取其新 URL，被放弃的慢引擎在守护线程中结束，不延迟进程退出（见 run_detached）。
+
+    为了在部分页面无效时仍能凑满 --max-results，搜索时请求 PIPELINE_CANDIDATE_FACTOR 倍的候选结果。
+    stream 为 True 时每个页面完成即输出一行 JSON。返回按完成顺序排列的页面列表。
+    给出 dedupe 阈值时，与已收集页面近似重复的页面被跳过且不计入 --max-results
+    （不输出时记录在先到页面的 "duplicates" 字段中）。
+    """
+    from web_fetch import NearDuplicateFilter, iter_relevant_web_pages, skip_duplicate
+
+    candidates = argparse.Namespace(**{**vars(args), "max_results": args.max_results * PIPELINE_CANDIDATE_FACTOR})
+    duplicates = NearDuplicateFilter(dedupe) if dedupe is not None else None
+    pages = []
+    fetched = iter_relevant_web_pages(iter_search_urls(candidates), prewarm=True, **fetch_kwargs)
+    async with aclosing(fetched):
+        async for page in fetched:
+            if page["status"] != "ok":
+                continue
+            if duplicates and stream and skip_duplicate(duplicates, page):
+                continue
+            if duplicates and not stream:
+                match = duplicates.check(page)
+                if match is not None:
+                    kept = next(p for p in pages if p["href"] == match[0])
+                    kept.setdefault("duplicates", []).append({"href": page["href"], "similarity": round(match[1], 3)})
+                    continue
+            if stream:
+                print(json.dumps(page, ensure_ascii=False), flush=True)
+            pages.append(page)
+            if len(pages) >= args.max_results:
+                break
+    return pages
+
+
+async def stream_detailed_content(urls, dedupe: float | None = None, **fetch_kwargs):
+    """每个页面抓取完成即输出一行 JSON（NDJSON），不等待最慢的页面；给出 dedupe 时跳过近似重复的页面。"""
+    from web_fetch import NearDuplicateFilter, iter_relevant_web_pages, skip_duplicate
+    duplicates = NearDuplicateFilter(dedupe) if dedupe is not None else None
+    async for page in iter_relevant_web_pages(urls, **fetch_kwargs):
+        if page["status"] != "ok":
+            continue
+        if duplicates and skip_duplicate(duplicates, page):
+            continue
+        print(json.dumps(page, ensure_ascii=False), flush=True)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Performs a web search using multiple search engine backends."
@@ -37,6 +422,7 @@ def main():
     parser.add_argument(
         "query",
         type=str,
+        nargs="?",
         help="Search query text"
     )
 
@@ -74,32 +460,168 @@ def main():
         help="Page number (default: 1)"
     )
 
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Read queries from FILE (one per line, '-' for stdin) and print one NDJSON record per query"
+    )
+
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=1,
+        help="With --batch: number of result pages to fetch per query, starting at --page; the following page is prefetched into the cache (default: 1)"
+    )
+
+    parser.add_argument(
+        "--batch-concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"With --batch: maximum number of searches running at the same time (default: {DEFAULT_BATCH_CONCURRENCY})"
+    )
+
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=DEFAULT_RATE_LIMIT,
+        help=f"With --batch: minimum seconds between two requests to the same engine (default: {DEFAULT_RATE_LIMIT})"
+    )
+
     parser.add_argument(
         "--backend",
-        choices=["auto", "bing", "brave", "duckduckgo", "google", "grokipedia", "mojeek", "yandex", "yahoo", "wikipedia"],
+        choices=BACKENDS,
         default="auto",
         help="Backend engine (default: auto)"
     )
 
+    parser.add_argument(
+        "--backends",
+        default=None,
+        help="Comma-separated engines to query concurrently, e.g. bing,brave,mojeek; results are deduplicated by URL and merged by reciprocal-rank fusion (overrides --backend)"
+    )
+
+    parser.add_argument(
+        "--backend-timeout",
+        type=float,
+        default=DEFAULT_BACKEND_TIMEOUT,
+        help=f"With --backends: maximum seconds to wait for each engine (default: {DEFAULT_BACKEND_TIMEOUT})"
+    )
+
     parser.add_argument(
         "--detailed_content",
         action="store_true",
         help="Will fetch and extract readable content using a headless browser."
     )
 
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="With --detailed_content: warm up the browser during the search, start fetching as results arrive (per engine with --backends; after the whole result page with a single --backend) and stop once --max-results pages with good content are collected"
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        type=float,
+        nargs="?",
+        const=DEFAULT_THRESHOLD,
+        metavar="THRESHOLD",
+        help=f"With --detailed_content: collapse near-duplicate pages such as syndicated copies (estimated Jaccard similarity >= THRESHOLD, default {DEFAULT_THRESHOLD})"
+    )
+
+    parser.add_argument(
+        "--passages",
+        action="store_true",
+        help="With --detailed_content: return only the passages of each page most relevant to the query (BM25) instead of the whole body"
+    )
+
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=DEFAULT_TOP_K,
+        help=f"With --passages: maximum number of passages per page (default: {DEFAULT_TOP_K})"
+    )
+
+    parser.add_argument(
+        "--max-chars",
+        type=int,
+        default=DEFAULT_MAX_CHARS,
+        help=f"With --passages: character budget for the passages of each page (default: {DEFAULT_MAX_CHARS})"
+    )
+
     parser.add_argument(
         "--readable_text",
         action="store_true",
         help="Print results as readable text"
     )
 
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the search result cache or, with --detailed_content, the on-disk page cache"
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached search results (and pages, with --detailed_content) and query again, updating the cache"
+    )
+
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Print search cache statistics (entries, hits, misses, hit rate) to stderr; may be used without a query"
+    )
+
+    parser.add_argument(
+        "--extract",
+        choices=["auto", "readability", "full"],
+        default="auto",
+        help="With --detailed_content: readability keeps only the main article, full converts the whole page, auto uses readability when it yields enough text (default: auto)"
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="json: one JSON array; ndjson: one JSON line per result, streamed as pages finish with --detailed_content (default: json)"
+    )
+
     args = parser.parse_args()
+    if args.batch:
+        if args.query is not None or args.detailed_content:
+            parser.error("--batch cannot be combined with a query argument or --detailed_content")
+        asyncio.run(run_batch(args, read_queries(args.batch)))
+        if args.cache_stats:
+            print_cache_stats()
+        return
+    if args.query is None:
+        if not args.cache_stats:
+            parser.error("the following arguments are required: query")
+        print_cache_stats()
+        return
 
-    results = search(args)
+    fetch_kwargs = dict(use_cache=not args.no_cache, refresh=args.refresh, extract=args.extract)
+    if args.passages:
+        fetch_kwargs.update(query=args.query, top_k=args.top_k, max_chars=args.max_chars)
+    if args.detailed_content and args.pipeline:
+        stream = args.format == "ndjson" and not args.readable_text
+        results = asyncio.run(pipelined_detailed_content(args, fetch_kwargs, stream, args.dedupe))
+        if args.cache_stats:
+            print_cache_stats()
+        if stream:
+            return
+    else:
+        results = search(args)
+        if args.cache_stats:
+            print_cache_stats()
 
-    if args.detailed_content:
+    if args.detailed_content and not args.pipeline:
+        urls = [r.get('href') for r in results]
+        if args.format == "ndjson" and not args.readable_text:
+            asyncio.run(stream_detailed_content(urls, args.dedupe, **fetch_kwargs))
+            return
         from web_fetch import fetch_relevant_web_pages
-        results = asyncio.run(fetch_relevant_web_pages([r.get('href') for r in results]))
+        results = asyncio.run(fetch_relevant_web_pages(urls, dedupe=args.dedupe, **fetch_kwargs))
 
     if args.readable_text:
         for i, r in enumerate(results, 1):
@@ -107,6 +629,9 @@ def main():
             print(f"   URL: {r.get('href')}")
             print(f"   Content: {r.get('body')}")
             print()
+    elif args.format == "ndjson":
+        for r in results:
+            print(json.dumps(r, ensure_ascii=False))
     else:
         print(json.dumps(results, indent=2, ensure_ascii=False))
 
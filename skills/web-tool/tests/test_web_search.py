@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS)
+
+SLOW_ENGINE_SECONDS = 5
+
+# 在子进程中运行 web_search.main()，DDGS 换成本地桩：mojeek 睡 SLOW_ENGINE_SECONDS 秒，其余立即返回
+CLI_WITH_SLOW_ENGINE = textwrap.dedent(f"""
+    import sys, time
+    sys.path.insert(0, {SCRIPTS!r})
+    import web_search
+
+    class FakeDDGS:
+        def __init__(self, timeout=None):
+            pass
+
+        def text(self, query, max_results, backend, **options):
+            if backend == "mojeek":
+                time.sleep({SLOW_ENGINE_SECONDS})
+            return [{{"title": f"{{backend}} {{i}}", "href": f"https://example.com/{{i}}", "body": "x"}} for i in range(max_results)]
+
+    web_search.DDGS = FakeDDGS
+    sys.argv = ["web_search.py", "query", "--backends", "bing,brave,mojeek", "--max-results", "2",
+                "--backend-timeout", "30", "--no-cache"]
+    web_search.main()
+""")
+
+
+def test_cli_exits_without_waiting_for_slow_engine():
+    start = time.monotonic()
+    proc = subprocess.run([sys.executable, "-c", CLI_WITH_SLOW_ENGINE], capture_output=True, text=True, timeout=30)
+    elapsed = time.monotonic() - start
+
+    assert proc.returncode == 0, proc.stderr
+    results = json.loads(proc.stdout)
+    assert [r["href"] for r in results] == ["https://example.com/0", "https://example.com/1"]
+    assert elapsed < SLOW_ENGINE_SECONDS - 2
+
+
+# --batch：第 1 页立即返回，下一页的预取睡 SLOW_ENGINE_SECONDS 秒
+BATCH_WITH_SLOW_PREFETCH = textwrap.dedent(f"""
+    import sys, time
+    sys.path.insert(0, {SCRIPTS!r})
+    import web_search
+
+    def fake_search(args, throttle=None):
+        if args.page > 1:
+            time.sleep({SLOW_ENGINE_SECONDS})
+        return [{{"title": args.query, "href": f"https://example.com/{{args.page}}", "body": "x"}}]
+
+    web_search.search = fake_search
+    sys.stdin = __import__("io").StringIO("first\\nsecond\\n")
+    sys.argv = ["web_search.py", "--batch", "-", "--rate-limit", "0"]
+    web_search.main()
+""")
+
+
+def test_batch_does_not_wait_for_slow_prefetch():
+    start = time.monotonic()
+    proc = subprocess.run([sys.executable, "-c", BATCH_WITH_SLOW_PREFETCH], capture_output=True, text=True, timeout=30)
+    elapsed = time.monotonic() - start
+
+    assert proc.returncode == 0, proc.stderr
+    records = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert sorted(r["query"] for r in records) == ["first", "second"]
+    assert all(r["pages"] == [1] and len(r["results"]) == 1 for r in records)
+    assert elapsed < SLOW_ENGINE_SECONDS - 2